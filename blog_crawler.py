@@ -1,30 +1,74 @@
 import requests
 import os
 import re
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 import json
-from image_storage import ImageBed
 import urllib.parse
+from image_storage import create_image_storage
 import time
-import schedule
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from ua_pool import UAPool
 from rate_limiter import RateLimiter
+from poll_scheduler import AdaptivePollScheduler
+from markdown_writer import MarkdownWriter, atomic_write
+from image_fetcher import ImageFetcher
+from html_renderer import HtmlRenderer
+from profiler import create_profiler
+
+# 默认博客源
+DEFAULT_SOURCE = {
+    'name': 'cuiliangblog',
+    'base_url': 'https://api.cuiliangblog.cn/v1/blog',
+    'origin': 'https://www.cuiliangblog.cn',
+    'referer': 'https://www.cuiliangblog.cn/'
+}
+
+def resolve_source(source: Optional[Dict] = None) -> Dict:
+    """
+    补全博客源配置
+    
+    未配置base_url时使用默认源；origin/referer未配置时从base_url推导，
+    不会沿用默认源的请求头。
+    
+    Args:
+        source (Optional[Dict]): 源配置
+    
+    Returns:
+        Dict: 包含 name、base_url、origin、referer 的源配置
+    """
+    source = {k: v for k, v in (source or {}).items() if v}
+    if source.get('base_url', DEFAULT_SOURCE['base_url']).rstrip('/') == DEFAULT_SOURCE['base_url']:
+        return {**DEFAULT_SOURCE, **source}
+    parsed = urllib.parse.urlparse(source['base_url'])
+    origin = source.get('origin') or f"{parsed.scheme}://{parsed.netloc}"
+    return {
+        'name': source.get('name') or parsed.netloc,
+        'base_url': source['base_url'],
+        'origin': origin,
+        'referer': source.get('referer') or f"{origin.rstrip('/')}/"
+    }
 
 class BlogCrawler:
     """博客爬虫类"""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, executor=None, session: Optional[requests.Session] = None, work_queue=None,
+                 profiler=None):
         """
         初始化爬虫
         
         Args:
             config (Dict): 配置字典，包含所有配置项
+            executor: 共享的任务执行器（多源模式下由调度器提供），为空时创建独立线程池
+            session (Optional[requests.Session]): 共享的HTTP会话（连接池），为空时创建独立会话
+            work_queue: 任务队列（协调者模式），设置后文章下载任务交由队列工作者处理
+            profiler: 共享的性能分析器（多源模式下所有源共用），为空时按配置创建
         """
-        # 基础URL
-        self.base_url = "https://api.cuiliangblog.cn/v1/blog"
+        # 博客源配置
+        source = resolve_source(config.get('source'))
+        self.source_name = source['name']
+        self.base_url = source['base_url'].rstrip('/')
         
         # UA池配置
         self.ua_pool = UAPool()
@@ -42,12 +86,22 @@ class BlogCrawler:
         self.base_headers = {
             'accept': 'application/json, text/plain, */*',
             'accept-language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'origin': 'https://www.cuiliangblog.cn',
-            'referer': 'https://www.cuiliangblog.cn/'
+            'origin': source['origin'],
+            'referer': source['referer']
         }
         
         # 线程池配置
-        self.executor = ThreadPoolExecutor(max_workers=config['thread_pool']['max_workers'])
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=config['thread_pool']['max_workers'])
+        
+        # HTTP会话（复用连接）
+        self._owns_session = session is None
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=config['thread_pool']['max_workers'])
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
         
         # 限速器配置
         self.rate_limiter = RateLimiter(
@@ -60,6 +114,8 @@ class BlogCrawler:
         self.temp_dir = os.path.join(self.base_dir, "temp")
         self.markdown_dir = os.path.join(self.base_dir, "markdown")
         self.message_file = os.path.join(self.base_dir, "message.json")
+        self._message_lock = threading.RLock()
+        self._message_fsync = config['storage'].get('fsync', True)
         
         # 创建必要的目录
         for directory in [self.base_dir, self.temp_dir, self.markdown_dir]:
@@ -68,11 +124,81 @@ class BlogCrawler:
         # 初始化或加载消息文件
         self._init_message_file()
         
+        # Markdown输出配置
+        storage_config = config['storage']
+        is_worker = config.get('queue', {}).get('role') == 'worker'
+        self.markdown_writer = MarkdownWriter(
+            self.markdown_dir,
+            layout=storage_config.get('layout', 'flat'),
+            naming=storage_config.get('naming', 'title'),
+            shard_size=storage_config.get('shard_size', 1000),
+            fsync=storage_config.get('fsync', True),
+            fsync_batch=storage_config.get('fsync_batch', 32),
+            fsync_interval=storage_config.get('fsync_interval', 5),
+            # 每批文件提交后统一保存一次消息文件
+            on_flush=None if is_worker else self._on_markdown_flush
+        )
+        # 工作者进程不改写消息文件，迁移由单机或协调者进程完成
+        if not is_worker:
+            self.markdown_writer.recover()
+            if self.markdown_writer.migrate(self.message_data["articles"]):
+                self._save_message_data()
+        
         # 监控配置
         self.check_interval = config['monitor']['interval']
+        self.poll_scheduler = AdaptivePollScheduler(
+            self.check_interval,
+            min_interval=config['monitor'].get('min_interval'),
+            max_interval=config['monitor'].get('max_interval'),
+            adaptive=config['monitor'].get('adaptive', False)
+        )
         
-        # 图床配置
-        self.image_bed = ImageBed(config['auth']['token'])
+        # 外部触发（Webhook）配置
+        self.coalesce_window = config.get('webhook', {}).get('coalesce_window', 2)
+        self._wake = threading.Event()
+        self._trigger_lock = threading.Lock()
+        self._pending_check = False
+        self._pending_articles: Dict[int, str] = {}
+        
+        # 图片存储配置
+        self.image_bed = create_image_storage(config, markdown_dir=self.markdown_dir)
+        
+        # 图片下载配置
+        fetch_config = config.get('image_fetch', {})
+        self.image_fetcher = ImageFetcher(
+            self.session,
+            self.temp_dir,
+            headers_fn=self._get_headers,
+            rate_limiter=self.rate_limiter,
+            max_size=int(fetch_config.get('max_size_mb', 20) * 1024 * 1024),
+            deadline=fetch_config.get('deadline', 60),
+            connect_timeout=fetch_config.get('connect_timeout', 10),
+            read_timeout=fetch_config.get('read_timeout', 30),
+            max_retries=fetch_config.get('max_retries', 3),
+            min_chunk=int(fetch_config.get('min_chunk_kb', 16) * 1024),
+            max_chunk=int(fetch_config.get('max_chunk_kb', 1024) * 1024)
+        )
+        self.image_fetcher.cleanup_partials()
+        
+        # HTML渲染配置（工作者进程不渲染）
+        render_config = config.get('render', {})
+        self.renderer = None
+        if render_config.get('enabled') and config.get('queue', {}).get('role') != 'worker':
+            self.renderer = HtmlRenderer(
+                self.markdown_dir,
+                render_config.get('output') or os.path.join(self.base_dir, 'html'),
+                workers=render_config.get('workers', 0),
+                site_title=render_config.get('site_title') or self.source_name,
+                allow_html=render_config.get('allow_html', False)
+            )
+        
+        # 性能分析配置
+        self.profiler = profiler or create_profiler(config, self.base_dir)
+        
+        # 任务队列配置
+        self.work_queue = work_queue
+        self.queue_poll_interval = config.get('queue', {}).get('poll_interval', 2)
+        self.queue_wait_timeout = config.get('queue', {}).get('wait_timeout', 600)
 
     def _init_message_file(self):
         """初始化或加载消息文件"""
@@ -87,10 +213,11 @@ class BlogCrawler:
             self._save_message_data()
 
     def _save_message_data(self):
-        """保存消息数据到文件"""
-        self.message_data["last_update"] = datetime.now().isoformat()
-        with open(self.message_file, 'w', encoding='utf-8') as f:
-            json.dump(self.message_data, f, ensure_ascii=False, indent=2)
+        """保存消息数据到文件（原子替换，崩溃时不会留下损坏的索引）"""
+        with self._message_lock:
+            self.message_data["last_update"] = datetime.now().isoformat()
+            text = json.dumps(self.message_data, ensure_ascii=False, indent=2)
+            atomic_write(self.message_file, text, fsync=self._message_fsync)
 
     def _get_all_articles(self) -> List[Dict]:
         """
@@ -131,20 +258,41 @@ class BlogCrawler:
         """
         return {int(article_id) for article_id in self.message_data["articles"].keys()}
 
-    def _update_article_meta(self, content: Dict):
+    def _update_article_meta(self, content: Dict, filepath: Optional[str] = None):
         """
-        更新文章元信息
+        更新内存中的文章元信息（消息文件在所在批次提交后由 _on_markdown_flush 统一保存）
         
         Args:
             content (Dict): 文章详细信息
+            filepath (Optional[str]): Markdown文件路径，记录为相对于Markdown目录的路径
         """
         # 移除body内容，保存其他元信息
-        article_meta = content.copy()
-        article_meta.pop('body', None)
+        article_meta = self._article_meta(content, filepath)
         
-        self.message_data["articles"][str(content['id'])] = article_meta
+        with self._message_lock:
+            self.message_data["articles"][str(content['id'])] = article_meta
+
+    def _on_markdown_flush(self, filepaths: List[str]):
+        """一批Markdown文件提交后保存消息文件"""
         self._save_message_data()
 
+    def _article_meta(self, content: Dict, filepath: Optional[str] = None) -> Dict:
+        """
+        生成文章元信息（不含正文）
+        
+        Args:
+            content (Dict): 文章详细信息
+            filepath (Optional[str]): Markdown文件路径
+            
+        Returns:
+            Dict: 文章元信息
+        """
+        article_meta = content.copy()
+        article_meta.pop('body', None)
+        if filepath:
+            article_meta['path'] = os.path.relpath(filepath, self.markdown_dir).replace(os.sep, '/')
+        return article_meta
+
     def _get_headers(self) -> Dict[str, str]:
         """获取请求头（带UA轮换）"""
         with self.ua_lock:
@@ -180,7 +328,7 @@ class BlogCrawler:
             kwargs['headers'] = self._get_headers()
             
             # 发送请求
-            response = requests.request(method, url, **kwargs)
+            response = self.session.request(method, url, **kwargs)
             response.raise_for_status()
             return response
         except requests.RequestException as e:
@@ -204,114 +352,270 @@ class BlogCrawler:
         ]
         print(f"需要下载文章数: {len(to_download)}")
         
+        return self._download_articles(to_download, force_download)
+
+    def _download_articles(self, to_download: List[Dict], force_download: bool = False) -> List[str]:
+        """
+        下载指定的文章列表
+        
+        Args:
+            to_download (List[Dict]): 文章列表，包含 id 和 type
+            force_download (bool): 队列模式下已完成的任务是否重新入队
+            
+        Returns:
+            List[str]: 保存的文件路径列表
+        """
+        # 协调者模式：任务交由队列工作者处理
+        if self.work_queue is not None:
+            saved_files = self._crawl_via_queue(to_download, force_download)
+            self.render_html(saved_files)
+            return saved_files
+        
         saved_files = []
         futures = []
         
+        def on_saved(filepath: str):
+            # 文件落盘且元信息已更新后才计入，消息文件在本批回调结束后保存
+            saved_files.append(filepath)
+            print(f"已保存: {filepath}")
+        
         # 提交下载任务到线程池
         for article in to_download:
             future = self.executor.submit(
-                self._download_single_article,
+                self.profiler.wrap(self._download_single_article),
                 article['id'],
-                article['type']
+                article['type'],
+                on_saved
             )
             futures.append(future)
         
         # 等待所有任务完成
         for future in as_completed(futures):
             try:
-                filepath = future.result()
-                if filepath:
-                    saved_files.append(filepath)
-                    print(f"已保存: {filepath}")
+                future.result()
             except Exception as e:
                 print(f"下载文章失败: {str(e)}")
         
+        # 提交本轮剩余的待刷盘文件
+        self.markdown_writer.flush()
+        self.render_html(saved_files)
         return saved_files
 
-    def _download_single_article(self, article_id: int, article_type: str) -> Optional[str]:
+    def render_html(self, changed_paths: Optional[List[str]] = None, full: bool = False):
+        """
+        增量渲染HTML（未启用渲染时不做处理）
+        
+        Args:
+            changed_paths (Optional[List[str]]): 本轮保存的Markdown文件
+            full (bool): 是否全量重建
+        """
+        if self.renderer is None:
+            return
+        if changed_paths is not None and not changed_paths and not full:
+            return
+        try:
+            self.renderer.render(self.message_data["articles"], changed_paths, full=full)
+        except Exception as e:
+            print(f"HTML渲染失败: {str(e)}")
+
+    def _crawl_via_queue(self, to_download: List[Dict], force_download: bool = False) -> List[str]:
+        """
+        将文章任务入队，等待工作者完成后合并结果
+        
+        Args:
+            to_download (List[Dict]): 需要下载的文章列表
+            force_download (bool): 已完成的任务是否重新入队
+            
+        Returns:
+            List[str]: 保存的文件路径列表
+        """
+        job_ids = []
+        queued = 0
+        for article in to_download:
+            job_id = f"{self.source_name}:{article['id']}"
+            payload = {'id': article['id'], 'type': article['type']}
+            # 工作者的消息数据不会更新，由协调者告知旧文件路径，标题修改后工作者才能删除旧文件
+            old_path = self.message_data["articles"].get(str(article['id']), {}).get('path')
+            if old_path:
+                payload['old_path'] = old_path
+            if self.work_queue.enqueue(job_id, self.source_name, payload, force=force_download):
+                queued += 1
+            job_ids.append(job_id)
+        print(f"已入队任务数: {queued}，等待工作者处理...")
+        
+        # 等待所有任务完成或失败
+        deadline = time.time() + self.queue_wait_timeout if self.queue_wait_timeout else None
+        pending = set(job_ids)
+        saved_files = []
+        while pending:
+            jobs = self.work_queue.get_jobs(list(pending))
+            for job_id, job in jobs.items():
+                if job['status'] == 'done':
+                    # 元信息只由协调者写入，避免多个工作者同时改写消息文件
+                    result = job['result'] or {}
+                    meta = result.get('meta')
+                    if meta:
+                        with self._message_lock:
+                            self.message_data["articles"][str(meta['id'])] = meta
+                        # 工作者返回的绝对路径只在其所在节点有效，按相对路径在本地重建
+                        if meta.get('path'):
+                            filepath = self.markdown_writer.absolute_path(meta['path'])
+                            saved_files.append(filepath)
+                            print(f"已保存: {filepath}")
+                    pending.discard(job_id)
+                elif job['status'] == 'failed':
+                    print(f"下载文章失败 {job_id}: {job['error']}")
+                    pending.discard(job_id)
+            if not pending:
+                break
+            if deadline and time.time() >= deadline:
+                print(f"等待超时，仍有 {len(pending)} 个任务未完成，将在下次检查时继续（请确认是否有工作者在运行）")
+                break
+            time.sleep(self.queue_poll_interval)
+        
+        if saved_files:
+            self._save_message_data()
+        return saved_files
+
+    def fetch_article(self, article_id: int, article_type: str,
+                      old_path: Optional[str] = None) -> Tuple[Dict, str]:
+        """
+        下载并保存单篇文章，不修改本地消息文件（供队列工作者使用）
+        
+        Args:
+            article_id (int): 文章ID
+            article_type (str): 文章类型
+            old_path (Optional[str]): 协调者记录的旧文件相对路径，路径变化时删除旧文件
+            
+        Returns:
+            Tuple[Dict, str]: (文章元信息, 保存的文件路径)
+        """
+        detail = self.get_article_detail(article_id, article_type)
+        filepath = self.save_markdown(detail, old_path=old_path)
+        # 结果提交到队列前文件必须已经落盘
+        self.markdown_writer.flush()
+        return self._article_meta(detail, filepath), filepath
+
+    def _download_single_article(self, article_id: int, article_type: str,
+                                 on_saved: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """
         下载单篇文章
         
+        文件可能在之后的批量刷盘中才落盘，元信息在文件提交后才写入消息文件，
+        避免崩溃后文章被记为已下载而文件不存在。
+        
         Args:
             article_id (int): 文章ID
             article_type (str): 文章类型
+            on_saved (Optional[Callable[[str], None]]): 文件提交并记录元信息后的回调
             
         Returns:
-            Optional[str]: 保存的文件路径，失败返回None
+            Optional[str]: 保存的文件路径（可能尚未提交），失败返回None
         """
         try:
             # 获取文章详细内容
             detail = self.get_article_detail(article_id, article_type)
             
-            # 更新文章元信息
-            self._update_article_meta(detail)
+            def on_commit(filepath: str):
+                # 更新文章元信息
+                self._update_article_meta(detail, filepath)
+                if on_saved is not None:
+                    on_saved(filepath)
             
             # 保存Markdown内容
-            return self.save_markdown(detail)
+            old_path = self.message_data["articles"].get(str(article_id), {}).get('path')
+            return self.save_markdown(detail, on_commit, old_path)
             
         except Exception as e:
             print(f"处理文章失败 {article_id}: {str(e)}")
             return None
 
-    def save_markdown(self, content: Dict) -> str:
+    def save_markdown(self, content: Dict, on_commit: Optional[Callable[[str], None]] = None,
+                      old_path: Optional[str] = None) -> str:
         """
         保存文章内容为Markdown文件
         
         Args:
             content (Dict): 文章内容
+            on_commit (Optional[Callable[[str], None]]): 文件提交（改名为目标文件）后的回调
+            old_path (Optional[str]): 该文章已有文件的相对路径，路径变化时删除旧文件
             
         Returns:
             str: 保存的文件路径
         """
-        # 处理文件名
-        safe_title = re.sub(r'[<>:"/\\|?*]', '_', content['title'])
-        filename = f"{safe_title}_{content['id']}.md"
-        filepath = os.path.join(self.markdown_dir, filename)
+        # 按配置的布局计算路径
+        relative_path = self.markdown_writer.relative_path(content)
+        filepath = self.markdown_writer.absolute_path(relative_path)
         
         # 处理正文中的图片
-        processed_body = self._process_markdown_images(content['body'])
+        processed_body = self._process_markdown_images(content['body'], os.path.dirname(filepath))
         
-        # 保存处理后的正文内容
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(processed_body)
+        # 原子写入处理后的正文内容
+        self.markdown_writer.write(relative_path, processed_body, on_commit)
+        
+        # 标题修改导致路径变化时删除旧文件
+        if old_path and old_path != relative_path:
+            self.markdown_writer.flush()
+            old_file = self.markdown_writer.absolute_path(old_path)
+            if os.path.exists(old_file):
+                os.remove(old_file)
         
         return filepath
 
-    def _process_markdown_images(self, content: str) -> str:
+    def _process_markdown_images(self, content: str, file_dir: Optional[str] = None) -> str:
         """
-        处理Markdown中的图片，下载并上传到图床
+        处理Markdown中的图片，下载后批量保存到图片存储
         
         Args:
             content (str): Markdown内容
+            file_dir (Optional[str]): Markdown文件所在目录，本地存储据此生成相对路径
             
         Returns:
             str: 处理后的Markdown内容
         """
+        # 匹配Markdown图片语法
+        pattern = r"!\[(.*?)\]\((.*?)\)"
+        image_urls = list(dict.fromkeys(match.group(2) for match in re.finditer(pattern, content)))
+        if not image_urls:
+            return content
+        
+        # 先下载全部图片
+        temp_paths: Dict[str, str] = {}
+        for image_url in image_urls:
+            temp_path = self._download_image(image_url)
+            if temp_path:
+                temp_paths[image_url] = temp_path
+        
+        # 批量上传到图片存储
+        new_urls: Dict[str, str] = {}
+        try:
+            results = self.image_bed.upload_batch(list(temp_paths.values()))
+            for image_url, temp_path in temp_paths.items():
+                result = results.get(temp_path)
+                if isinstance(result, str):
+                    new_urls[image_url] = self.image_bed.link_for(result, file_dir or self.markdown_dir)
+                else:
+                    print(f"处理图片失败 {image_url}: {str(result)}")
+        finally:
+            # 删除临时文件
+            for temp_path in temp_paths.values():
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+        
         def replace_image(match):
             alt_text = match.group(1)
             image_url = match.group(2)
-            
-            try:
-                # 下载图片
-                temp_path = self._download_image(image_url)
-                if temp_path:
-                    # 上传到图床
-                    new_url = self.image_bed.image_upload(temp_path)
-                    # 删除临时文件
-                    os.remove(temp_path)
-                    return f"![{alt_text}]({new_url})"
-                return match.group(0)
-            except Exception as e:
-                print(f"处理图片失败 {image_url}: {str(e)}")
-                return match.group(0)
+            if image_url in new_urls:
+                return f"![{alt_text}]({new_urls[image_url]})"
+            return match.group(0)
         
-        # 匹配Markdown图片语法
-        pattern = r"!\[(.*?)\]\((.*?)\)"
         return re.sub(pattern, replace_image, content)
 
     def _download_image(self, image_url: str) -> Optional[str]:
         """
-        下载图片到临时目录
+        下载图片到临时目录（带大小上限、时限和断点续传）
         
         Args:
             image_url (str): 图片URL
@@ -319,26 +623,7 @@ class BlogCrawler:
         Returns:
             Optional[str]: 临时文件路径，下载失败返回None
         """
-        try:
-            # 解析URL，获取文件名
-            parsed_url = urllib.parse.urlparse(image_url)
-            filename = os.path.basename(parsed_url.path)
-            if not filename:
-                filename = f"image_{datetime.now().strftime('%Y%m%d%H%M%S')}.png"
-            
-            temp_path = os.path.join(self.temp_dir, filename)
-            
-            # 下载图片
-            response = self._make_request(image_url, need_rate_limit=True)  # 下载图片时需要限速
-            if response.status_code == 200:
-                with open(temp_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                return temp_path
-            return None
-        except Exception as e:
-            print(f"下载图片失败 {image_url}: {str(e)}")
-            return None
+        return self.image_fetcher.fetch(image_url)
 
     def get_monthly_stats(self) -> Dict[str, Dict[str, int]]:
         """
@@ -463,48 +748,162 @@ class BlogCrawler:
             seconds (int): 间隔秒数
         """
         self.check_interval = seconds
+        self.poll_scheduler.base_interval = seconds
 
-    def watch(self, auto_download: bool = True):
+    def run_check(self, auto_download: bool = True) -> bool:
         """
-        启动监控服务
+        执行一次检查，发现更新时按需下载
         
         Args:
             auto_download (bool): 发现更新时是否自动下载
+            
+        Returns:
+            bool: 是否发现更新
         """
-        def check_and_download():
-            try:
+        try:
+            with self.profiler.cycle(self.source_name) as cycle:
                 if self.check_updates():
                     if auto_download:
                         print("开始下载新文章...")
-                        self.crawl_incremental()
+                        with cycle.allocations():
+                            self.crawl_incremental()
                     else:
                         print("检测到更新，但未启用自动下载")
+                    return True
+        except Exception as e:
+            print(f"检查更新时发生错误: {str(e)}")
+        return False
+
+    def trigger(self, article_id: Optional[int] = None, article_type: Optional[str] = None):
+        """
+        外部触发一次检查，短时间内的多次触发会被合并
+        
+        Args:
+            article_id (Optional[int]): 指定文章ID时只下载该文章，否则执行完整检查
+            article_type (Optional[str]): 文章类型（section / article），为空时使用本地记录的类型
+        """
+        if article_type not in (None, 'section', 'article'):
+            raise ValueError(f"不支持的文章类型: {article_type}")
+        with self._trigger_lock:
+            if article_id is None:
+                self._pending_check = True
+            else:
+                known = self.message_data["articles"].get(str(article_id), {})
+                self._pending_articles[int(article_id)] = article_type or known.get('type') or 'section'
+        self._wake.set()
+
+    def wake(self):
+        """唤醒监控循环（用于停止时立即退出等待）"""
+        self._wake.set()
+
+    def _has_pending_triggers(self) -> bool:
+        """是否有待处理的触发请求"""
+        with self._trigger_lock:
+            return self._pending_check or bool(self._pending_articles)
+
+    def _run_triggered(self, auto_download: bool = True) -> bool:
+        """
+        处理累积的触发请求
+        
+        Args:
+            auto_download (bool): 完整检查发现更新时是否自动下载
+            
+        Returns:
+            bool: 是否下载或发现了新内容
+        """
+        with self._trigger_lock:
+            run_check = self._pending_check
+            articles = self._pending_articles
+            self._pending_check = False
+            self._pending_articles = {}
+        
+        found = False
+        if articles:
+            # 指定文章的触发视为明确请求，已下载的文章也会重新下载
+            print(f"[{self.source_name}] 立即下载触发的文章: {', '.join(str(i) for i in articles)}")
+            to_download = [{'id': article_id, 'type': article_type} for article_id, article_type in articles.items()]
+            try:
+                found = bool(self._download_articles(to_download, force_download=True))
             except Exception as e:
-                print(f"检查更新时发生错误: {str(e)}")
+                print(f"下载触发的文章时发生错误: {str(e)}")
+        if run_check:
+            found = self.run_check(auto_download) or found
+        return found
 
-        # 设置定时任务
-        schedule.every(self.check_interval).seconds.do(check_and_download)
+    def _learn_publish_pattern(self):
+        """根据本地记录的文章发布时间更新轮询规律"""
+        self.poll_scheduler.learn(
+            article.get('created_time', '') for article in self.message_data["articles"].values()
+        )
+
+    def watch(self, auto_download: bool = True, stop_event: Optional[threading.Event] = None):
+        """
+        启动监控服务
+        
+        检查在当前线程中同步执行，下次检查从本次检查结束后开始计时，
+        因此检查之间不会重叠，也不会因为某次检查耗时过长而堆积。
+        
+        Args:
+            auto_download (bool): 发现更新时是否自动下载
+            stop_event (Optional[threading.Event]): 停止信号，多源模式下由外部控制
+        """
+        stop_event = stop_event or threading.Event()
+        scheduler = self.poll_scheduler
+        self._learn_publish_pattern()
         
-        print(f"监控服务已启动，每 {self.check_interval} 秒检查一次更新...")
-        print(f"下次检查时间: {(datetime.now() + timedelta(seconds=self.check_interval)).strftime('%Y-%m-%d %H:%M:%S')}")
+        if scheduler.adaptive:
+            print(f"[{self.source_name}] 监控服务已启动，自适应检查间隔 {scheduler.min_interval}~{scheduler.max_interval} 秒...")
+        else:
+            print(f"[{self.source_name}] 监控服务已启动，每 {self.check_interval} 秒检查一次更新...")
         
-        # 持续运行定时任务
-        while True:
+        deadline = None
+        while not stop_event.is_set():
             try:
-                schedule.run_pending()
-                time.sleep(1)
+                if deadline is None:
+                    interval = scheduler.next_interval()
+                    deadline = time.monotonic() + interval
+                    print(f"[{self.source_name}] 下次检查时间: {(datetime.now() + timedelta(seconds=interval)).strftime('%Y-%m-%d %H:%M:%S')}")
+                
+                # 精确等待到下次检查时间，期间可被外部触发唤醒
+                self._wake.wait(max(deadline - time.monotonic(), 0))
+                self._wake.clear()
+                if stop_event.is_set():
+                    break
+                
+                if self._has_pending_triggers():
+                    # 等待一个合并窗口，把连续的触发合并为一次处理
+                    if stop_event.wait(self.coalesce_window):
+                        break
+                    if self._run_triggered(auto_download):
+                        self._learn_publish_pattern()
+                    continue
+                
+                if time.monotonic() < deadline:
+                    continue
+                deadline = None
+                
+                found_updates = self.run_check(auto_download)
+                scheduler.record_check(found_updates)
+                if found_updates:
+                    self._learn_publish_pattern()
             except KeyboardInterrupt:
                 print("\n监控服务已停止")
                 break
             except Exception as e:
                 print(f"运行时发生错误: {str(e)}")
-                time.sleep(self.check_interval)
+                stop_event.wait(self.check_interval)
 
     def __del__(self):
         """清理资源"""
         try:
-            if hasattr(self, 'executor'):
+            if hasattr(self, 'executor') and self._owns_executor:
                 self.executor.shutdown(wait=True)
+            if hasattr(self, 'session') and self._owns_session:
+                self.session.close()
+            if hasattr(self, 'markdown_writer'):
+                self.markdown_writer.flush()
+            if hasattr(self, 'image_bed'):
+                self.image_bed.close()
         except Exception as e:
             print(f"清理资源时发生错误: {str(e)}")
 
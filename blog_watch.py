@@ -1,15 +1,24 @@
 import argparse
 import os
+import threading
 import yaml
 from blog_crawler import BlogCrawler
+from multi_source import MultiSourceWatcher
+from work_queue import QueueWorker, create_work_queue
+from webhook_server import WebhookServer
 
 def load_config(config_path=None):
     """加载配置文件"""
     # 默认配置
     default_config = {
         'auth': {'token': ''},
+        'source': {},
+        'sources': [],
         'monitor': {
             'interval': 3600,
+            'adaptive': False,
+            'min_interval': 3600,
+            'max_interval': 14400,
             'auto_download': True,
             'force_download': False
         },
@@ -22,7 +31,78 @@ def load_config(config_path=None):
             'requests_per_minute': 5,
             'window': 60
         },
-        'storage': {'path': './storage'}
+        'storage': {
+            'path': './storage',
+            'layout': 'flat',
+            'naming': 'title',
+            'shard_size': 1000,
+            'fsync': True,
+            'fsync_batch': 32,
+            'fsync_interval': 5
+        },
+        'webhook': {
+            'enabled': False,
+            'host': '127.0.0.1',
+            'port': 8765,
+            'token': '',
+            'coalesce_window': 2
+        },
+        'queue': {
+            'role': 'standalone',
+            'backend': 'sqlite',
+            'path': '',
+            'lease_seconds': 300,
+            'heartbeat_interval': 60,
+            'max_attempts': 3,
+            'poll_interval': 2,
+            'wait_timeout': 600,
+            'worker_id': '',
+            'worker_concurrency': 0,
+            'local_workers': 0
+        },
+        'render': {
+            'enabled': False,
+            'output': '',
+            'workers': 0,
+            'site_title': '',
+            'allow_html': False
+        },
+        'profile': {
+            'enabled': False,
+            'mode': 'sampling',
+            'cycles': 0,
+            'sample_rate': 0.1,
+            'interval': 0.01,
+            'tracemalloc': True,
+            'tracemalloc_frames': 1,
+            'top_allocators': 25,
+            'keep': 50,
+            'output': ''
+        },
+        'image_fetch': {
+            'max_size_mb': 20,
+            'deadline': 60,
+            'connect_timeout': 10,
+            'read_timeout': 30,
+            'max_retries': 3,
+            'min_chunk_kb': 16,
+            'max_chunk_kb': 1024
+        },
+        'image_storage': {
+            'backend': 'remote',
+            'upload_workers': 4,
+            'remote': {'api_url': 'http://158.178.236.241/api/index.php'},
+            'local': {'path': '', 'url_prefix': ''},
+            's3': {
+                'bucket': '',
+                'endpoint_url': '',
+                'access_key': '',
+                'secret_key': '',
+                'region': '',
+                'prefix': 'images',
+                'public_url': ''
+            }
+        }
     }
     
     # 首先尝试加载默认的config.yaml
@@ -60,6 +140,9 @@ def load_config(config_path=None):
     env_mapping = {
         'AUTH_TOKEN': ('auth', 'token'),
         'MONITOR_INTERVAL': ('monitor', 'interval'),
+        'MONITOR_ADAPTIVE': ('monitor', 'adaptive'),
+        'MONITOR_MIN_INTERVAL': ('monitor', 'min_interval'),
+        'MONITOR_MAX_INTERVAL': ('monitor', 'max_interval'),
         'AUTO_DOWNLOAD': ('monitor', 'auto_download'),
         'FORCE_DOWNLOAD': ('monitor', 'force_download'),
         'UA_FILE': ('ua_pool', 'file'),
@@ -67,7 +150,26 @@ def load_config(config_path=None):
         'MAX_WORKERS': ('thread_pool', 'max_workers'),
         'RATE_LIMIT': ('rate_limit', 'requests_per_minute'),
         'RATE_WINDOW': ('rate_limit', 'window'),
-        'STORAGE_PATH': ('storage', 'path')
+        'STORAGE_PATH': ('storage', 'path'),
+        'STORAGE_LAYOUT': ('storage', 'layout'),
+        'STORAGE_NAMING': ('storage', 'naming'),
+        'IMAGE_MAX_SIZE_MB': ('image_fetch', 'max_size_mb'),
+        'IMAGE_DEADLINE': ('image_fetch', 'deadline'),
+        'IMAGE_STORAGE_BACKEND': ('image_storage', 'backend'),
+        'IMAGE_UPLOAD_WORKERS': ('image_storage', 'upload_workers'),
+        'WEBHOOK_ENABLED': ('webhook', 'enabled'),
+        'WEBHOOK_HOST': ('webhook', 'host'),
+        'WEBHOOK_PORT': ('webhook', 'port'),
+        'WEBHOOK_TOKEN': ('webhook', 'token'),
+        'RENDER_ENABLED': ('render', 'enabled'),
+        'RENDER_WORKERS': ('render', 'workers'),
+        'PROFILE_ENABLED': ('profile', 'enabled'),
+        'PROFILE_MODE': ('profile', 'mode'),
+        'PROFILE_CYCLES': ('profile', 'cycles'),
+        'PROFILE_SAMPLE_RATE': ('profile', 'sample_rate'),
+        'QUEUE_ROLE': ('queue', 'role'),
+        'QUEUE_PATH': ('queue', 'path'),
+        'WORKER_ID': ('queue', 'worker_id')
     }
     
     # 记录环境变量覆盖
@@ -80,6 +182,8 @@ def load_config(config_path=None):
                 value = value.lower() in ('true', '1', 'yes')
             elif isinstance(default_config[config_path[0]][config_path[1]], int):
                 value = int(value)
+            elif isinstance(default_config[config_path[0]][config_path[1]], float):
+                value = float(value)
             default_config[config_path[0]][config_path[1]] = value
             env_overrides.append(f"{env_key}={value}")
     
@@ -87,16 +191,138 @@ def load_config(config_path=None):
         print("环境变量覆盖:", ", ".join(env_overrides))
     
     # 验证必要的配置项
-    if not default_config['auth']['token']:
+    if default_config['queue']['role'] not in ('standalone', 'coordinator', 'worker'):
+        raise ValueError(f"不支持的运行角色: {default_config['queue']['role']}")
+    if default_config['profile']['mode'] not in ('sampling', 'cprofile'):
+        raise ValueError(f"不支持的分析方式: {default_config['profile']['mode']}")
+    
+    # 仅远程图床需要认证token
+    if default_config['image_storage']['backend'] == 'remote' and not default_config['auth']['token']:
         raise ValueError("缺少必要的配置项: auth.token")
     
     return default_config
 
+def positive_int(value):
+    """命令行参数：正整数"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"不是整数: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须大于等于1: {value}")
+    return number
+
 def parse_args():
     parser = argparse.ArgumentParser(description='博客文章监控下载工具')
     parser.add_argument('--config', type=str, help='配置文件路径')
+    parser.add_argument('--role', type=str, choices=['standalone', 'coordinator', 'worker'],
+                        help='运行角色，覆盖配置文件中的 queue.role')
+    parser.add_argument('--rebuild-html', action='store_true',
+                        help='全量重建HTML后退出（需要启用 render.enabled）')
+    parser.add_argument('--profile', type=positive_int, nargs='?', const=1, metavar='N',
+                        help='分析接下来的N个抓取周期（默认1个），报告保存在 storage/profiles')
+    parser.add_argument('--profile-mode', type=str, choices=['sampling', 'cprofile'],
+                        help='分析方式，覆盖配置文件中的 profile.mode')
     return parser.parse_args()
 
+def start_webhook(crawlers, config):
+    """按配置启动Webhook监听服务"""
+    webhook_config = config['webhook']
+    if not webhook_config['enabled']:
+        return None
+    server = WebhookServer(
+        crawlers,
+        host=webhook_config['host'],
+        port=webhook_config['port'],
+        token=webhook_config['token']
+    )
+    server.start()
+    return server
+
+def create_queue_worker(crawlers, work_queue, config):
+    """创建队列工作者"""
+    queue_config = config['queue']
+    return QueueWorker(
+        crawlers,
+        work_queue,
+        worker_id=queue_config['worker_id'] or None,
+        concurrency=queue_config['worker_concurrency'] or config['thread_pool']['max_workers'],
+        poll_interval=queue_config['poll_interval'],
+        heartbeat_interval=queue_config['heartbeat_interval']
+    )
+
+def start_local_workers(crawlers, work_queue, config):
+    """在协调者进程内启动工作者线程"""
+    count = config['queue']['local_workers']
+    # 进程内队列只能由本进程的工作者处理
+    if config['queue']['backend'] == 'memory' and count <= 0:
+        count = 1
+    for index in range(count):
+        worker = create_queue_worker(crawlers, work_queue, config)
+        worker.worker_id = f"{worker.worker_id}-local{index}"
+        threading.Thread(target=worker.run, name=f"local-worker-{index}", daemon=True).start()
+    if count:
+        print(f"- 本地工作者: {count}")
+
+def run_worker(config, work_queue):
+    """工作者模式：只从任务队列领取并处理文章任务"""
+    if config['sources']:
+        crawlers = MultiSourceWatcher(config).crawlers
+    else:
+        crawler = BlogCrawler(config)
+        crawlers = {crawler.source_name: crawler}
+    
+    worker = create_queue_worker(crawlers, work_queue, config)
+    stop_event = threading.Event()
+    try:
+        worker.run(stop_event)
+    except KeyboardInterrupt:
+        stop_event.set()
+        print("\n工作者已停止")
+
+def rebuild_html(crawlers):
+    """全量重建各源的HTML"""
+    for name, crawler in crawlers.items():
+        if crawler.renderer is None:
+            print(f"[{name}] 未启用HTML渲染（render.enabled），跳过")
+            continue
+        print(f"[{name}] 开始全量重建HTML...")
+        crawler.render_html(full=True)
+
+def run_multi_source(config, work_queue=None, rebuild=False):
+    """多源模式：在一个进程中监控多个博客"""
+    watcher = MultiSourceWatcher(config, work_queue=work_queue)
+    
+    if rebuild:
+        rebuild_html(watcher.crawlers)
+        watcher.stop()
+        return
+    if work_queue is not None:
+        start_local_workers(watcher.crawlers, work_queue, config)
+    
+    print("\n博客源:")
+    for name, crawler in watcher.crawlers.items():
+        print(f"- {name}: {crawler.base_url} (间隔 {crawler.check_interval}秒, 存储 {crawler.base_dir})")
+    
+    if config['monitor']['force_download']:
+        print("\n开始强制重新下载所有源的文章...")
+        watcher.crawl_all(force_download=True)
+        watcher.stop()
+        return
+    
+    # 补齐上次运行后未渲染的页面
+    for crawler in watcher.crawlers.values():
+        crawler.render_html()
+    
+    print("\n执行首次检查...")
+    watcher.check_all(auto_download=config['monitor']['auto_download'])
+    
+    print("\n监控服务配置信息:")
+    print(f"- 自动下载: {'禁用' if not config['monitor']['auto_download'] else '启用'}")
+    print(f"- 共享线程数: {config['thread_pool']['max_workers']}")
+    start_webhook(watcher.crawlers, config)
+    watcher.watch(auto_download=config['monitor']['auto_download'])
+
 def main():
     args = parse_args()
     
@@ -108,21 +334,59 @@ def main():
         print("\n当前配置信息:")
         print(f"- Token: {'*' * 8}{config['auth']['token'][-4:]}")
         print(f"- UA文件: {config['ua_pool']['file']}")
-        print(f"- 存储路径: {config['storage']['path']}")
+        print(f"- 存储路径: {config['storage']['path']} (布局: {config['storage']['layout']}, 命名: {config['storage']['naming']})")
+        print(f"- 图片存储: {config['image_storage']['backend']}")
+        if config['render']['enabled']:
+            print(f"- HTML渲染: {config['render']['output'] or '存储路径/html'}")
+        
+        # 命令行开启的分析针对接下来的N个周期，不再抽样
+        if args.profile is not None:
+            config['profile'].update({'enabled': True, 'cycles': args.profile, 'sample_rate': 1.0})
+        if args.profile_mode:
+            config['profile']['mode'] = args.profile_mode
+        if config['profile']['enabled']:
+            profile_config = config['profile']
+            print(f"- 性能分析: {profile_config['mode']} (周期数: {profile_config['cycles'] or '不限'}, 采样比例: {profile_config['sample_rate']})")
+        
+        # 运行角色
+        role = args.role or config['queue']['role']
+        config['queue']['role'] = role
+        work_queue = None
+        if role != 'standalone':
+            work_queue = create_work_queue(config)
+            print(f"- 运行角色: {role} (队列: {config['queue']['backend']})")
+        if role == 'worker':
+            run_worker(config, work_queue)
+            return
+        
+        # 配置了多个源时进入多源模式
+        if config['sources']:
+            run_multi_source(config, work_queue, rebuild=args.rebuild_html)
+            return
         
         # 创建爬虫实例
-        crawler = BlogCrawler(config)
+        crawler = BlogCrawler(config, work_queue=work_queue)
+        if args.rebuild_html:
+            rebuild_html({crawler.source_name: crawler})
+            return
+        if work_queue is not None:
+            start_local_workers({crawler.source_name: crawler}, work_queue, config)
+        
+        # 补齐上次运行后未渲染的页面
+        crawler.render_html()
         
         # 首次启动检查
         print("\n执行首次检查...")
-        has_updates = crawler.check_updates()
-        if has_updates and config['monitor']['auto_download']:
-            print("检测到更新，开始下载新文章...")
-            crawler.crawl_incremental()
-        elif has_updates and not config['monitor']['auto_download']:
-            print("检测到更新，但自动下载已禁用")
-        else:
-            print("首次检查完成，未发现新文章")
+        with crawler.profiler.cycle('initial') as cycle:
+            has_updates = crawler.check_updates()
+            if has_updates and config['monitor']['auto_download']:
+                print("检测到更新，开始下载新文章...")
+                with cycle.allocations():
+                    crawler.crawl_incremental()
+            elif has_updates and not config['monitor']['auto_download']:
+                print("检测到更新，但自动下载已禁用")
+            else:
+                print("首次检查完成，未发现新文章")
         
         if config['monitor']['force_download']:
             print("\n开始强制重新下载所有文章...")
@@ -130,16 +394,23 @@ def main():
             print(f"- 最大线程数: {config['thread_pool']['max_workers']}")
             print(f"- 限速: {config['rate_limit']['requests_per_minute']}次/{config['rate_limit']['window']}秒")
             print(f"- UA更换间隔: {config['ua_pool']['change_interval']}次请求")
-            crawler.crawl_incremental(force_download=True)
+            with crawler.profiler.cycle('force') as cycle, cycle.allocations():
+                crawler.crawl_incremental(force_download=True)
             return
             
         print("\n监控服务配置信息:")
-        print(f"- 检查间隔: {config['monitor']['interval']}秒")
+        if config['monitor']['adaptive']:
+            print(f"- 检查间隔: 自适应 {config['monitor']['min_interval']}~{config['monitor']['max_interval']}秒")
+        else:
+            print(f"- 检查间隔: {config['monitor']['interval']}秒")
         print(f"- 自动下载: {'禁用' if not config['monitor']['auto_download'] else '启用'}")
         print(f"- 最大线程数: {config['thread_pool']['max_workers']}")
         print(f"- 限速: {config['rate_limit']['requests_per_minute']}次/{config['rate_limit']['window']}秒")
         print(f"- UA更换间隔: {config['ua_pool']['change_interval']}次请求")
         
+        # 启动Webhook监听
+        start_webhook({crawler.source_name: crawler}, config)
+        
         # 启动监控
         crawler.watch(auto_download=config['monitor']['auto_download'])
         
@@ -0,0 +1,398 @@
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+from markdown_writer import rebase_image_links
+
+# 模板或渲染逻辑变化时递增，触发全量重建
+RENDER_VERSION = 3
+
+# 链接和图片地址中不允许的协议
+UNSAFE_URL = re.compile(r'^\s*(javascript|vbscript|data|file):', re.IGNORECASE)
+
+# 不允许HTML时使用的扩展：等同于 extra 去掉 attr_list 和 md_in_html
+# （attr_list 允许文章给元素添加任意属性，例如 onclick）
+SAFE_EXTENSIONS = ['abbr', 'def_list', 'fenced_code', 'footnotes', 'tables']
+
+# 少于该数量的页面直接在当前进程渲染，避免启动进程池的开销
+MIN_POOL_JOBS = 8
+
+STYLE = """
+body { max-width: 860px; margin: 2em auto; padding: 0 1em; font-family: -apple-system, "Segoe UI", "PingFang SC", "Microsoft YaHei", sans-serif; line-height: 1.7; color: #222; }
+a { color: #0366d6; text-decoration: none; }
+a:hover { text-decoration: underline; }
+nav { margin-bottom: 1.5em; font-size: 0.9em; }
+pre { background: #f6f8fa; padding: 1em; overflow: auto; }
+code { background: #f6f8fa; padding: 0.1em 0.3em; }
+pre code { padding: 0; }
+img { max-width: 100%; }
+table { border-collapse: collapse; }
+th, td { border: 1px solid #ddd; padding: 0.3em 0.6em; }
+.meta { color: #888; font-size: 0.9em; }
+ul.list li { margin: 0.3em 0; }
+"""
+
+
+def month_of(created_time: str) -> str:
+    """按发布时间取月份，格式与 get_monthly_stats 的键一致（YYYY-MM）"""
+    month = str(created_time or '')[:7]
+    return month if len(month) == 7 and month[4] == '-' else 'unknown'
+
+
+def monthly_stats(articles: Iterable[Dict]) -> Dict[str, Dict[str, int]]:
+    """
+    按月份统计文章和笔记数量，结构与 BlogCrawler.get_monthly_stats 的返回值一致
+    
+    Args:
+        articles (Iterable[Dict]): 文章元信息
+    
+    Returns:
+        Dict[str, Dict[str, int]]: 例如 {'2025-03': {'article': 0, 'section': 1}}
+    """
+    stats: Dict[str, Dict[str, int]] = {}
+    for meta in articles:
+        counts = stats.setdefault(month_of(meta.get('created_time')), {'article': 0, 'section': 0})
+        article_type = meta.get('type', 'section')
+        counts[article_type] = counts.get(article_type, 0) + 1
+    return stats
+
+
+def _page(title: str, body: str, css_href: str, nav: str = '') -> str:
+    """生成完整的HTML页面"""
+    return (
+        "<!DOCTYPE html>\n<html lang=\"zh-CN\">\n<head>\n<meta charset=\"utf-8\">\n"
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">\n"
+        f"<title>{html.escape(title)}</title>\n<link rel=\"stylesheet\" href=\"{css_href}\">\n"
+        f"</head>\n<body>\n{nav}\n{body}\n</body>\n</html>\n"
+    )
+
+
+def _write_atomic(path: str, text: str):
+    """先写临时文件再改名"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp, path)
+
+
+def _rel(target: str, from_dir: str) -> str:
+    """生成相对链接"""
+    return os.path.relpath(target, from_dir).replace(os.sep, '/')
+
+
+def _safe_html_extension():
+    """
+    Markdown扩展：把原文中的HTML当作普通文本转义输出，去掉事件属性和危险协议的链接
+    
+    远程文章中的 <script> 等标签不会原样进入本地归档。
+    """
+    from markdown.extensions import Extension
+    from markdown.treeprocessors import Treeprocessor
+    
+    class UnsafeUrlRemover(Treeprocessor):
+        def run(self, root):
+            for element in root.iter():
+                for attr in [name for name in element.keys() if name.lower().startswith('on')]:
+                    del element.attrib[attr]
+                for attr in ('href', 'src'):
+                    value = element.get(attr, '')
+                    # 图片允许内嵌的 data:image/ 地址
+                    if element.tag == 'img' and attr == 'src' and value.strip().lower().startswith('data:image/'):
+                        continue
+                    if UNSAFE_URL.match(value):
+                        element.set(attr, '#')
+    
+    class SafeHtmlExtension(Extension):
+        def extendMarkdown(self, md):
+            md.preprocessors.deregister('html_block')
+            md.inlinePatterns.deregister('html')
+            md.treeprocessors.register(UnsafeUrlRemover(md), 'unsafe_url_remover', 0)
+    
+    return SafeHtmlExtension()
+
+
+def _render_page(job: Dict) -> str:
+    """
+    渲染单篇文章（在进程池中执行，必须是模块级函数）
+    
+    Args:
+        job (Dict): 渲染参数，包含 source、target、title、created_time、month、css、month_page、index_page、allow_html
+    
+    Returns:
+        str: 生成的HTML文件路径
+    """
+    import markdown
+    
+    with open(job['source'], 'r', encoding='utf-8') as f:
+        text = f.read()
+    target_dir = os.path.dirname(job['target'])
+    # 本地图片的相对路径需要改为相对于HTML文件
+    text = rebase_image_links(text, os.path.dirname(job['source']), target_dir)
+    if job.get('allow_html'):
+        extensions = ['extra', 'sane_lists', 'toc']
+    else:
+        extensions = SAFE_EXTENSIONS + ['sane_lists', 'toc', _safe_html_extension()]
+    content = markdown.markdown(text, extensions=extensions)
+    
+    nav = (
+        f"<nav><a href=\"{_rel(job['index_page'], target_dir)}\">首页</a> / "
+        f"<a href=\"{_rel(job['month_page'], target_dir)}\">{html.escape(job['month'])}</a></nav>"
+    )
+    body = (
+        f"<article>\n<h1>{html.escape(job['title'])}</h1>\n"
+        f"<p class=\"meta\">{html.escape(str(job['created_time'] or ''))}</p>\n{content}\n</article>"
+    )
+    _write_atomic(job['target'], _page(job['title'], body, _rel(job['css'], target_dir), nav))
+    return job['target']
+
+
+def _render_page_safe(job: Dict) -> Optional[str]:
+    """渲染单篇文章，返回错误信息（成功时为None），避免单篇失败中断整批"""
+    try:
+        _render_page(job)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+class HtmlRenderer:
+    """静态HTML渲染器
+    
+    根据文章元信息中的 path 找到Markdown文件，增量生成：
+        <output>/articles/...    文章页面（目录结构与Markdown一致）
+        <output>/months/YYYY-MM.html  月份索引
+        <output>/index.html      首页（按月份列出）
+    
+    渲染状态保存在 <output>/.render_state.json，只重建内容变化的文章页面
+    以及受影响的月份索引页。
+    """
+    
+    def __init__(self, markdown_dir: str, output_dir: str, workers: int = 0, site_title: str = '博客归档',
+                 allow_html: bool = False):
+        """
+        初始化渲染器
+        
+        Args:
+            markdown_dir (str): Markdown根目录
+            output_dir (str): HTML输出目录
+            workers (int): 进程数，0表示使用CPU核数
+            site_title (str): 站点标题
+            allow_html (bool): 是否保留原文中的HTML（默认转义，避免远程文章中的脚本进入本地归档）
+        """
+        try:
+            import markdown  # noqa: F401
+        except ImportError:
+            raise ImportError("使用HTML渲染需要安装markdown: pip install markdown")
+        
+        self.markdown_dir = os.path.abspath(markdown_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.site_title = site_title
+        self.allow_html = allow_html
+        self.state_file = os.path.join(self.output_dir, '.render_state.json')
+        self.css_path = os.path.join(self.output_dir, 'style.css')
+        self.index_path = os.path.join(self.output_dir, 'index.html')
+        os.makedirs(self.output_dir, exist_ok=True)
+    
+    def render(self, articles: Dict[str, Dict], changed_paths: Optional[Iterable[str]] = None,
+               full: bool = False) -> Dict[str, int]:
+        """
+        增量渲染
+        
+        Args:
+            articles (Dict[str, Dict]): 文章ID到元信息的映射（message.json 中的 articles）
+            changed_paths (Optional[Iterable[str]]): 本轮抓取保存的Markdown文件，这些文件一定会重新检查内容
+            full (bool): 是否全量重建
+        
+        Returns:
+            Dict[str, int]: 渲染统计 {'pages': 重建的文章数, 'months': 重建的月份页数, 'removed': 删除的页面数}
+        """
+        started = time.monotonic()
+        state = self._load_state()
+        if state.get('version') != RENDER_VERSION or state.get('allow_html', False) != self.allow_html:
+            full = True
+        old_pages: Dict[str, Dict] = state.get('pages', {}) if not full else {}
+        changed = {os.path.abspath(path) for path in (changed_paths or [])}
+        
+        pages: Dict[str, Dict] = {}
+        jobs: List[Dict] = []
+        affected_months: Set[str] = set()
+        
+        for article_id, meta in articles.items():
+            if not meta.get('path'):
+                continue
+            source = os.path.join(self.markdown_dir, *meta['path'].split('/'))
+            try:
+                stat = os.stat(source)
+            except OSError:
+                continue
+            entry = {
+                'path': meta['path'],
+                'title': meta.get('title') or str(article_id),
+                'created_time': meta.get('created_time') or '',
+                'type': meta.get('type', 'section'),
+                'month': month_of(meta.get('created_time')),
+                'html': 'articles/' + os.path.splitext(meta['path'])[0] + '.html',
+                'stat': [stat.st_mtime_ns, stat.st_size]
+            }
+            old = old_pages.get(article_id)
+            target = os.path.join(self.output_dir, *entry['html'].split('/'))
+            listing_changed = old is None or any(
+                old.get(key) != entry[key] for key in ('title', 'created_time', 'month', 'html', 'type')
+            )
+            
+            # 文件状态未变化时不读取内容
+            if (old and not listing_changed and source not in changed
+                    and old.get('stat') == entry['stat'] and os.path.exists(target)):
+                entry['hash'] = old['hash']
+                pages[article_id] = entry
+                continue
+            
+            entry['hash'] = self._hash_file(source)
+            pages[article_id] = entry
+            if old and not listing_changed and old.get('hash') == entry['hash'] and os.path.exists(target):
+                continue
+            
+            jobs.append(self._job(source, target, entry))
+            if listing_changed:
+                affected_months.add(entry['month'])
+                if old:
+                    affected_months.add(old['month'])
+                    if old['html'] != entry['html']:
+                        self._remove(os.path.join(self.output_dir, *old['html'].split('/')))
+        
+        # 已删除的文章
+        removed = 0
+        for article_id, old in old_pages.items():
+            if article_id not in pages:
+                self._remove(os.path.join(self.output_dir, *old['html'].split('/')))
+                affected_months.add(old['month'])
+                removed += 1
+        
+        self._run_jobs(jobs)
+        
+        # 重建受影响的索引页
+        by_month: Dict[str, List[Dict]] = {}
+        for entry in pages.values():
+            by_month.setdefault(entry['month'], []).append(entry)
+        if full:
+            affected_months = set(by_month.keys())
+        for month in affected_months:
+            month_path = self._month_path(month)
+            if month in by_month:
+                self._render_month(month, by_month[month])
+            else:
+                self._remove(month_path)
+        if full or affected_months or not os.path.exists(self.index_path):
+            self._render_index(pages.values())
+        if full or not os.path.exists(self.css_path):
+            _write_atomic(self.css_path, STYLE.lstrip())
+        
+        self._save_state({'version': RENDER_VERSION, 'allow_html': self.allow_html, 'pages': pages})
+        result = {'pages': len(jobs), 'months': len(affected_months), 'removed': removed}
+        if jobs or affected_months or removed:
+            print(f"HTML渲染完成: 文章 {result['pages']} 篇, 月份索引 {result['months']} 页, "
+                  f"删除 {removed} 页, 耗时 {time.monotonic() - started:.2f} 秒")
+        return result
+    
+    def _job(self, source: str, target: str, entry: Dict) -> Dict:
+        """生成单篇文章的渲染参数"""
+        return {
+            'source': source,
+            'target': target,
+            'title': entry['title'],
+            'created_time': entry['created_time'],
+            'month': entry['month'],
+            'css': self.css_path,
+            'month_page': self._month_path(entry['month']),
+            'index_page': self.index_path,
+            'allow_html': self.allow_html
+        }
+    
+    def _run_jobs(self, jobs: List[Dict]):
+        """渲染文章页面，数量较多时使用进程池并行"""
+        if not jobs:
+            return
+        if len(jobs) < MIN_POOL_JOBS or self.workers <= 1:
+            errors = map(_render_page_safe, jobs)
+            self._report_errors(jobs, errors)
+            return
+        chunksize = max(1, len(jobs) // (self.workers * 4))
+        # 主进程中有多个线程在运行，fork可能复制出持有锁的状态，使用spawn启动子进程
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            self._report_errors(jobs, pool.map(_render_page_safe, jobs, chunksize=chunksize))
+    
+    @staticmethod
+    def _report_errors(jobs: List[Dict], errors: Iterable[Optional[str]]):
+        """输出渲染失败的页面"""
+        for job, error in zip(jobs, errors):
+            if error:
+                print(f"渲染失败 {job['source']}: {error}")
+    
+    def _render_month(self, month: str, entries: List[Dict]):
+        """生成月份索引页"""
+        month_path = self._month_path(month)
+        month_dir = os.path.dirname(month_path)
+        items = []
+        for entry in sorted(entries, key=lambda e: e['created_time'], reverse=True):
+            href = _rel(os.path.join(self.output_dir, *entry['html'].split('/')), month_dir)
+            items.append(
+                f"<li><a href=\"{href}\">{html.escape(entry['title'])}</a> "
+                f"<span class=\"meta\">{html.escape(entry['created_time'][:10])}</span></li>"
+            )
+        nav = f"<nav><a href=\"{_rel(self.index_path, month_dir)}\">首页</a></nav>"
+        body = f"<h1>{html.escape(month)}</h1>\n<ul class=\"list\">\n" + "\n".join(items) + "\n</ul>"
+        _write_atomic(month_path, _page(f"{month} - {self.site_title}", body, _rel(self.css_path, month_dir), nav))
+    
+    def _render_index(self, entries: Iterable[Dict]):
+        """生成首页，按月份列出文章和笔记数量"""
+        stats = monthly_stats(entries)
+        items = []
+        for month in sorted(stats.keys(), reverse=True):
+            counts = stats[month]
+            href = _rel(self._month_path(month), self.output_dir)
+            items.append(
+                f"<li><a href=\"{href}\">{html.escape(month)}</a> "
+                f"<span class=\"meta\">文章 {counts.get('article', 0)} / 笔记 {counts.get('section', 0)}</span></li>"
+            )
+        body = f"<h1>{html.escape(self.site_title)}</h1>\n<ul class=\"list\">\n" + "\n".join(items) + "\n</ul>"
+        _write_atomic(self.index_path, _page(self.site_title, body, 'style.css'))
+    
+    def _month_path(self, month: str) -> str:
+        """月份索引页路径"""
+        return os.path.join(self.output_dir, 'months', f"{month}.html")
+    
+    def _load_state(self) -> Dict:
+        """加载渲染状态"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_state(self, state: Dict):
+        """保存渲染状态"""
+        _write_atomic(self.state_file, json.dumps(state, ensure_ascii=False))
+    
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        """计算文件内容哈希"""
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _remove(path: str):
+        """删除文件，忽略错误"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,351 @@
+import contextlib
+import hashlib
+import os
+import socket
+import threading
+import time
+import urllib.parse
+import uuid
+import requests
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+
+# 未完成下载的文件后缀
+PART_SUFFIX = '.part'
+# 与 .part 文件放在一起，记录其对应的ETag或Last-Modified，续传时用作If-Range
+VALIDATOR_SUFFIX = '.part.validator'
+
+
+class ImageTooLarge(Exception):
+    """图片超过大小上限"""
+    pass
+
+
+class ImageFetcher:
+    """图片下载器
+    
+    - 先用HEAD请求检查Content-Length，超过上限的图片直接跳过
+    - 下载中断后保留 .part 文件，重试时（或之后再次下载同一图片时）用Range请求续传，
+      并带上If-Range，图片已变化时服务器返回完整内容，不会拼接出两个版本
+    - 根据读取速度自适应调整分块大小
+    - 每张图片有总时长上限，超时后放弃（保留已下载部分），避免长时间占用工作线程
+    - 同一URL同一时间只有一个线程写 .part 文件，下载完成后改名为每次调用独有的临时文件，
+      多篇文章引用同一图片时互不干扰
+    """
+    
+    def __init__(self, session: requests.Session, temp_dir: str,
+                 headers_fn: Optional[Callable[[], Dict[str, str]]] = None, rate_limiter=None,
+                 max_size: int = 20 * 1024 * 1024, deadline: float = 60,
+                 connect_timeout: float = 10, read_timeout: float = 30, max_retries: int = 3,
+                 min_chunk: int = 16 * 1024, max_chunk: int = 1024 * 1024):
+        """
+        初始化下载器
+        
+        Args:
+            session (requests.Session): HTTP会话
+            temp_dir (str): 临时文件目录
+            headers_fn (Optional[Callable]): 生成请求头的函数（用于UA轮换）
+            rate_limiter: 限速器，每张图片等待一次
+            max_size (int): 单张图片大小上限（字节），0表示不限制
+            deadline (float): 单张图片下载总时长上限（秒），0表示不限制
+            connect_timeout (float): 连接超时（秒）
+            read_timeout (float): 读取超时（秒）
+            max_retries (int): 下载中断后的最大重试次数
+            min_chunk (int): 最小分块大小（字节）
+            max_chunk (int): 最大分块大小（字节）
+        """
+        self.session = session
+        self.temp_dir = temp_dir
+        self.headers_fn = headers_fn or (lambda: {})
+        self.rate_limiter = rate_limiter
+        self.max_size = max_size
+        self.deadline = deadline
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max(0, max_retries)
+        self.min_chunk = max(1024, min_chunk)
+        self.max_chunk = max(self.min_chunk, max_chunk)
+        # URL -> [锁, 使用者数量]
+        self._url_locks: Dict[str, list] = {}
+        self._url_locks_guard = threading.Lock()
+    
+    def fetch(self, image_url: str) -> Optional[str]:
+        """
+        下载图片到临时目录
+        
+        Args:
+            image_url (str): 图片URL
+        
+        Returns:
+            Optional[str]: 临时文件路径（每次调用独有，由调用方删除），下载失败或超过限制返回None
+        """
+        with self._url_lock(image_url):
+            return self._fetch(image_url)
+    
+    @contextlib.contextmanager
+    def _url_lock(self, image_url: str):
+        """持有URL对应的锁，无人使用时自动移除"""
+        with self._url_locks_guard:
+            entry = self._url_locks.setdefault(image_url, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._url_locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._url_locks[image_url]
+    
+    def _fetch(self, image_url: str) -> Optional[str]:
+        """下载图片（调用方需持有该URL的锁）"""
+        temp_path = self._temp_path(image_url)
+        part_path = temp_path + PART_SUFFIX
+        # 完成的文件改名为独有路径，避免其他文章的清理删除正在使用的文件
+        final_path = self._unique_path(temp_path)
+        
+        try:
+            # 每张图片只占用一次限速配额（HEAD、续传重试不重复计数）
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait()
+            # 时限只计算下载本身，不包括等待URL锁和限速的时间
+            deadline_at = time.monotonic() + self.deadline if self.deadline else None
+            
+            self._check_size(image_url)
+            
+            for attempt in range(self.max_retries + 1):
+                if attempt and self._expired(deadline_at):
+                    break
+                try:
+                    if self._download(image_url, part_path, deadline_at):
+                        os.replace(part_path, final_path)
+                        self._remove_quietly(self._validator_path(part_path))
+                        return final_path
+                except (requests.RequestException, IOError) as e:
+                    if self._expired(deadline_at) or attempt >= self.max_retries:
+                        raise
+                    print(f"下载图片中断，准备续传 {image_url}: {str(e)}")
+                    time.sleep(min(2 ** attempt, 5))
+            print(f"下载图片不完整 {image_url}")
+            return None
+        except ImageTooLarge as e:
+            print(f"跳过图片 {image_url}: {str(e)}")
+            self._discard_partial(part_path)
+            return None
+        except Exception as e:
+            print(f"下载图片失败 {image_url}: {str(e)}")
+            return None
+    
+    def _check_size(self, image_url: str):
+        """HEAD请求预检图片大小，服务器不支持HEAD时忽略"""
+        if not self.max_size:
+            return
+        try:
+            response = self.session.head(
+                image_url,
+                headers=self._headers(),
+                timeout=(self.connect_timeout, self.read_timeout),
+                allow_redirects=True
+            )
+        except requests.RequestException:
+            return
+        if response.status_code == 200:
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > self.max_size:
+                raise ImageTooLarge(f"大小 {int(length)} 字节超过上限 {self.max_size} 字节")
+    
+    def _download(self, image_url: str, part_path: str, deadline_at: Optional[float]) -> bool:
+        """
+        下载（或续传）到 .part 文件
+        
+        Returns:
+            bool: 是否下载完整
+        """
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        validator = self._read_validator(part_path) if offset else None
+        if offset and not validator:
+            # 无法确认 .part 与服务器上的图片是同一版本，重新下载
+            self._discard_partial(part_path)
+            offset = 0
+        headers = self._headers()
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+            headers['If-Range'] = validator
+        
+        with self.session.get(
+            image_url,
+            headers=headers,
+            stream=True,
+            timeout=(self.connect_timeout, self.read_timeout)
+        ) as response:
+            if response.status_code == 416 and offset:
+                # .part 比服务器上的图片还大，说明图片已变化，丢弃后重新下载
+                response.close()
+                self._discard_partial(part_path)
+                return self._download(image_url, part_path, deadline_at)
+            response.raise_for_status()
+            
+            if response.status_code == 206 and self._range_start(response) == offset:
+                mode = 'ab'
+            else:
+                # 服务器不支持续传或图片已变化，重新下载
+                offset = 0
+                mode = 'wb'
+                self._write_validator(part_path, response)
+            
+            length = response.headers.get('Content-Length')
+            expected = offset + int(length) if length and length.isdigit() else None
+            if self.max_size and expected and expected > self.max_size:
+                raise ImageTooLarge(f"大小 {expected} 字节超过上限 {self.max_size} 字节")
+            
+            # 到达时限时直接关闭连接，防止服务器慢速传输让单次读取一直阻塞
+            watchdog = None
+            if deadline_at is not None:
+                watchdog = threading.Timer(max(deadline_at - time.monotonic(), 0), self._abort, args=(response,))
+                watchdog.daemon = True
+                watchdog.start()
+            
+            written = offset
+            chunk_size = self.min_chunk
+            try:
+                with open(part_path, mode) as f:
+                    while True:
+                        started = time.monotonic()
+                        try:
+                            chunk = response.raw.read(chunk_size)
+                        except (Urllib3HTTPError, OSError, ValueError, AttributeError) as e:
+                            if self._expired(deadline_at):
+                                raise requests.Timeout(f"超过单张图片下载时限 {self.deadline} 秒，已下载 {written} 字节")
+                            raise requests.ConnectionError(str(e))
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        written += len(chunk)
+                        if self.max_size and written > self.max_size:
+                            raise ImageTooLarge(f"已下载 {written} 字节，超过上限 {self.max_size} 字节")
+                        chunk_size = self._next_chunk_size(chunk_size, len(chunk), time.monotonic() - started)
+            finally:
+                if watchdog is not None:
+                    watchdog.cancel()
+            
+            if self._expired(deadline_at) and (expected is None or written < expected):
+                raise requests.Timeout(f"超过单张图片下载时限 {self.deadline} 秒，已下载 {written} 字节")
+            
+            return expected is None or written >= expected
+    
+    def _next_chunk_size(self, chunk_size: int, received: int, elapsed: float) -> int:
+        """读取很快时加大分块，读取缓慢时减小分块，使下载时限能及时生效"""
+        if received >= chunk_size and elapsed < 0.05:
+            return min(chunk_size * 2, self.max_chunk)
+        if elapsed > 1:
+            return max(chunk_size // 2, self.min_chunk)
+        return chunk_size
+    
+    @staticmethod
+    def _abort(response: requests.Response):
+        """关闭底层socket，打断其他线程中阻塞的读取"""
+        sock = getattr(getattr(response.raw, '_connection', None), 'sock', None)
+        if sock is None:
+            # urllib3 1.x 没有 _connection 属性
+            fp = getattr(getattr(response.raw, '_fp', None), 'fp', None)
+            sock = getattr(getattr(fp, 'raw', None), '_sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        response.close()
+    
+    def _headers(self) -> Dict[str, str]:
+        """图片请求头：禁用压缩，保证Range按原始字节计算"""
+        headers = dict(self.headers_fn())
+        headers['accept'] = 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8'
+        headers['Accept-Encoding'] = 'identity'
+        return headers
+    
+    @staticmethod
+    def _validator_path(part_path: str) -> str:
+        """.part 文件对应的校验信息文件"""
+        return part_path[:-len(PART_SUFFIX)] + VALIDATOR_SUFFIX
+    
+    def _read_validator(self, part_path: str) -> Optional[str]:
+        """读取 .part 文件对应的ETag或Last-Modified"""
+        try:
+            with open(self._validator_path(part_path), 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+    
+    def _write_validator(self, part_path: str, response: requests.Response):
+        """记录本次下载的ETag（弱ETag不能用于If-Range）或Last-Modified，两者都没有时不能续传"""
+        etag = response.headers.get('ETag', '')
+        validator = etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+        if not validator:
+            self._remove_quietly(self._validator_path(part_path))
+            return
+        with open(self._validator_path(part_path), 'w', encoding='utf-8') as f:
+            f.write(validator)
+    
+    def _discard_partial(self, part_path: str):
+        """删除 .part 文件及其校验信息"""
+        self._remove_quietly(part_path)
+        self._remove_quietly(self._validator_path(part_path))
+    
+    @staticmethod
+    def _unique_path(temp_path: str) -> str:
+        """在固定临时文件名中插入随机串，保留扩展名"""
+        directory, filename = os.path.split(temp_path)
+        return os.path.join(directory, f"{uuid.uuid4().hex[:8]}_{filename}")
+    
+    def _temp_path(self, image_url: str) -> str:
+        """按URL生成固定的临时文件名，便于续传"""
+        parsed_url = urllib.parse.urlparse(image_url)
+        filename = os.path.basename(parsed_url.path)
+        if not filename:
+            filename = f"image_{datetime.now().strftime('%Y%m%d%H%M%S')}.png"
+        url_hash = hashlib.md5(image_url.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.temp_dir, f"{url_hash}_{filename}")
+    
+    def cleanup_partials(self, max_age: float = 86400):
+        """
+        清理长时间未续传的 .part 文件及其校验信息
+        
+        Args:
+            max_age (float): 超过该秒数未修改的文件会被删除
+        """
+        now = time.time()
+        try:
+            names = os.listdir(self.temp_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(PART_SUFFIX) or name.endswith(VALIDATOR_SUFFIX):
+                path = os.path.join(self.temp_dir, name)
+                try:
+                    if now - os.path.getmtime(path) > max_age:
+                        os.remove(path)
+                except OSError:
+                    pass
+    
+    @staticmethod
+    def _range_start(response: requests.Response) -> Optional[int]:
+        """解析Content-Range的起始位置"""
+        content_range = response.headers.get('Content-Range', '')
+        try:
+            return int(content_range.split(' ', 1)[1].split('-', 1)[0])
+        except (IndexError, ValueError):
+            return None
+    
+    @staticmethod
+    def _expired(deadline_at: Optional[float]) -> bool:
+        """是否已超过时限"""
+        return deadline_at is not None and time.monotonic() >= deadline_at
+    
+    @staticmethod
+    def _remove_quietly(path: str):
+        """删除文件，忽略错误"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
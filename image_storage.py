@@ -1,31 +1,163 @@
+import hashlib
+import mimetypes
+import os
+import shutil
+import threading
 import requests
-from typing import Dict, Optional, Union
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
 
-class ImageBed:
+
+class ImageStorage(ABC):
+    """图片存储后端基类"""
+    
+    def __init__(self, upload_workers: int = 4):
+        """
+        初始化存储后端
+        
+        Args:
+            upload_workers (int): 批量上传时的并发数
+        """
+        self.upload_workers = max(1, upload_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+    
+    @abstractmethod
+    def image_upload(self, image_path: str) -> str:
+        """
+        保存单张图片
+        
+        Args:
+            image_path (str): 图片文件路径
+        
+        Returns:
+            str: 可在Markdown中引用的图片地址
+        """
+    
+    def link_for(self, url: str, file_dir: str) -> str:
+        """
+        生成在指定目录下的Markdown文件中引用图片的地址
+        
+        Args:
+            url (str): image_upload 返回的地址
+            file_dir (str): Markdown文件所在目录
+        
+        Returns:
+            str: 图片地址，远程存储直接返回原地址
+        """
+        return url
+    
+    def upload_batch(self, image_paths: List[str]) -> Dict[str, Union[str, Exception]]:
+        """
+        并发批量上传图片
+        
+        Args:
+            image_paths (List[str]): 图片文件路径列表
+        
+        Returns:
+            Dict[str, Union[str, Exception]]: 文件路径到图片地址的映射，失败的项为异常对象
+        """
+        results: Dict[str, Union[str, Exception]] = {}
+        unique_paths = list(dict.fromkeys(image_paths))
+        if not unique_paths:
+            return results
+        
+        # 单张图片无需经过线程池
+        if len(unique_paths) == 1 or self.upload_workers == 1:
+            for path in unique_paths:
+                try:
+                    results[path] = self.image_upload(path)
+                except Exception as e:
+                    results[path] = e
+            return results
+        
+        executor = self._get_executor()
+        futures = {path: executor.submit(self.image_upload, path) for path in unique_paths}
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                results[path] = e
+        return results
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """懒加载上传线程池（与文章下载线程池分离，避免相互等待）"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.upload_workers,
+                    thread_name_prefix='image-upload'
+                )
+            return self._executor
+    
+    def close(self):
+        """释放资源"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+    
+    @staticmethod
+    def _content_key(image_path: str) -> str:
+        """
+        计算图片的内容地址（sha256 + 原扩展名）
+        
+        Args:
+            image_path (str): 图片文件路径
+        
+        Returns:
+            str: 形如 ab/abcdef....png 的存储键
+        """
+        digest = hashlib.sha256()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        hex_digest = digest.hexdigest()
+        ext = os.path.splitext(image_path)[1].lower()
+        if not ext or len(ext) > 6:
+            ext = '.png'
+        return f"{hex_digest[:2]}/{hex_digest}{ext}"
+
+
+class ImageBed(ImageStorage):
     """图床操作类"""
     
-    def __init__(self, token: str, api_url: str = "http://158.178.236.241/api/index.php"):
+    # 保留最近多少次上传的响应信息（删除链接、缩略图等）
+    MAX_UPLOAD_RESPONSES = 1024
+    
+    def __init__(self, token: str, api_url: str = "http://158.178.236.241/api/index.php", upload_workers: int = 4):
         """
         初始化图床类
         
         Args:
             token (str): 认证token
             api_url (str): API基础URL
+            upload_workers (int): 批量上传时的并发数
         """
+        super().__init__(upload_workers)
         self.token = token
         self.api_url = api_url
-        self._last_upload_response: Optional[Dict] = None
-
+        # 并发上传时按图片URL记录响应，避免相互覆盖
+        self._upload_responses: "OrderedDict[str, Dict]" = OrderedDict()
+        self._responses_lock = threading.Lock()
+        # 复用连接，避免每张图片都重新建立TCP/TLS连接
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.upload_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
     def image_upload(self, image_path: str) -> str:
         """
         上传图片到图床
         
         Args:
             image_path (str): 图片文件路径
-            
+        
         Returns:
             str: 上传成功后的图片URL
-            
+        
         Raises:
             Exception: 上传失败时抛出异常
         """
@@ -33,63 +165,280 @@ class ImageBed:
             with open(image_path, 'rb') as f:
                 files = {'image': f}
                 data = {'token': self.token}
-                response = requests.post(self.api_url, files=files, data=data)
-                
+                response = self.session.post(self.api_url, files=files, data=data)
+            
             if response.status_code == 200:
                 result = response.json()
                 if result['code'] == 200:
-                    self._last_upload_response = result
+                    self._remember_response(result)
                     return result['url']
                 raise Exception(f"上传失败: {result.get('message', '未知错误')}")
             raise Exception(f"请求失败，状态码: {response.status_code}")
         except Exception as e:
             raise Exception(f"图片上传过程出错: {str(e)}")
-
+    
+    def _remember_response(self, result: Dict):
+        """记录上传响应，超出上限时丢弃最早的记录"""
+        with self._responses_lock:
+            self._upload_responses[result['url']] = result
+            self._upload_responses.move_to_end(result['url'])
+            while len(self._upload_responses) > self.MAX_UPLOAD_RESPONSES:
+                self._upload_responses.popitem(last=False)
+    
+    def _upload_response(self, url: str) -> Dict:
+        """获取指定图片的上传响应"""
+        with self._responses_lock:
+            return self._upload_responses.get(url) or {}
+    
     def image_del(self, url: str) -> int:
         """
         删除已上传的图片
         
         Args:
             url (str): 图片URL
-            
+        
         Returns:
             int: 操作状态码
         """
-        if self._last_upload_response and 'del' in self._last_upload_response:
+        upload_response = self._upload_response(url)
+        if 'del' in upload_response:
             try:
-                response = requests.get(self._last_upload_response['del'])
+                response = self.session.get(upload_response['del'])
                 return response.status_code
             except Exception as e:
                 raise Exception(f"删除图片失败: {str(e)}")
         raise Exception("没有找到删除链接，请确保图片已正确上传")
-
+    
     def show_thumb(self, url: str) -> str:
         """
         获取图片缩略图URL
         
         Args:
             url (str): 原图片URL
-            
+        
         Returns:
             str: 缩略图URL
         """
-        if self._last_upload_response and 'thumb' in self._last_upload_response:
-            return self._last_upload_response['thumb']
+        upload_response = self._upload_response(url)
+        if 'thumb' in upload_response:
+            return upload_response['thumb']
         raise Exception("没有找到缩略图信息，请确保图片已正确上传")
-
+    
     def show_original(self, url: str) -> str:
         """
         获取原始文件名
         
         Args:
             url (str): 图片URL
-            
+        
         Returns:
             str: 原始文件名
         """
-        if self._last_upload_response and 'srcName' in self._last_upload_response:
-            return self._last_upload_response['srcName']
+        upload_response = self._upload_response(url)
+        if 'srcName' in upload_response:
+            return upload_response['srcName']
         raise Exception("没有找到原始文件名信息，请确保图片已正确上传")
+    
+    def close(self):
+        """释放资源"""
+        super().close()
+        self.session.close()
+
+
+class LocalImageStorage(ImageStorage):
+    """本地内容寻址图片存储，按文件内容哈希去重，以相对路径引用"""
+    
+    def __init__(self, root: str, relative_to: Optional[str] = None,
+                 url_prefix: str = '', upload_workers: int = 4):
+        """
+        初始化本地存储
+        
+        Args:
+            root (str): 图片存储目录
+            relative_to (Optional[str]): 生成相对路径时的参照目录（通常为Markdown目录）
+            url_prefix (str): 若设置，则以该前缀拼接存储键作为图片地址
+            upload_workers (int): 批量保存时的并发数
+        """
+        super().__init__(upload_workers)
+        self.root = os.path.abspath(root)
+        self.relative_to = os.path.abspath(relative_to) if relative_to else None
+        self.url_prefix = url_prefix
+        os.makedirs(self.root, exist_ok=True)
+    
+    def image_upload(self, image_path: str) -> str:
+        """
+        将图片保存到内容寻址目录
+        
+        Args:
+            image_path (str): 图片文件路径
+        
+        Returns:
+            str: 图片的相对路径或带前缀的地址
+        """
+        try:
+            key = self._content_key(image_path)
+            target = os.path.join(self.root, *key.split('/'))
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # 先复制到临时文件再改名，保证并发写入同一内容时文件完整
+                tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+                shutil.copyfile(image_path, tmp_path)
+                os.replace(tmp_path, target)
+            return self._url_for(key, target)
+        except Exception as e:
+            raise Exception(f"图片保存过程出错: {str(e)}")
+    
+    def link_for(self, url: str, file_dir: str) -> str:
+        """
+        将相对于参照目录的图片路径转换为相对于Markdown文件所在目录（用于分片目录布局）
+        
+        Args:
+            url (str): image_upload 返回的地址
+            file_dir (str): Markdown文件所在目录
+        
+        Returns:
+            str: 图片地址
+        """
+        if self.url_prefix or not self.relative_to:
+            return url
+        target = os.path.normpath(os.path.join(self.relative_to, url))
+        return os.path.relpath(target, os.path.abspath(file_dir)).replace(os.sep, '/')
+    
+    def _url_for(self, key: str, target: str) -> str:
+        """根据配置生成图片地址"""
+        if self.url_prefix:
+            return f"{self.url_prefix.rstrip('/')}/{key}"
+        if self.relative_to:
+            return os.path.relpath(target, self.relative_to).replace(os.sep, '/')
+        return target
+
+
+class S3ImageStorage(ImageStorage):
+    """S3兼容对象存储（可用MinIO等本地服务替代）"""
+    
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None,
+                 access_key: Optional[str] = None, secret_key: Optional[str] = None,
+                 region: Optional[str] = None, prefix: str = 'images',
+                 public_url: Optional[str] = None, upload_workers: int = 4):
+        """
+        初始化S3存储
+        
+        Args:
+            bucket (str): 存储桶名称
+            endpoint_url (Optional[str]): S3兼容服务地址，为空时使用AWS默认地址
+            access_key (Optional[str]): 访问密钥ID
+            secret_key (Optional[str]): 访问密钥
+            region (Optional[str]): 区域
+            prefix (str): 对象键前缀
+            public_url (Optional[str]): 对外访问的基础URL，为空时由endpoint和bucket拼接
+            upload_workers (int): 批量上传时的并发数
+        """
+        super().__init__(upload_workers)
+        try:
+            import boto3
+            from botocore.config import Config as BotoConfig
+        except ImportError:
+            raise ImportError("使用S3存储需要安装boto3: pip install boto3")
+        
+        if not bucket:
+            raise ValueError("缺少必要的配置项: image_storage.s3.bucket")
+        
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=region or None,
+            config=BotoConfig(max_pool_connections=self.upload_workers)
+        )
+        if public_url:
+            self.public_url = public_url.rstrip('/')
+        elif endpoint_url:
+            self.public_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_url = f"https://{bucket}.s3.amazonaws.com"
+    
+    def image_upload(self, image_path: str) -> str:
+        """
+        上传图片到S3，已存在的相同内容对象不会重复上传
+        
+        Args:
+            image_path (str): 图片文件路径
+        
+        Returns:
+            str: 图片URL
+        """
+        try:
+            key = self._content_key(image_path)
+            if self.prefix:
+                key = f"{self.prefix}/{key}"
+            if not self._exists(key):
+                content_type = mimetypes.guess_type(image_path)[0] or 'application/octet-stream'
+                self.client.upload_file(
+                    image_path, self.bucket, key,
+                    ExtraArgs={'ContentType': content_type}
+                )
+            return f"{self.public_url}/{key}"
+        except Exception as e:
+            raise Exception(f"图片上传过程出错: {str(e)}")
+    
+    def _exists(self, key: str) -> bool:
+        """判断对象是否已存在"""
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except Exception:
+            return False
+
+
+def create_image_storage(config: Dict, markdown_dir: Optional[str] = None) -> ImageStorage:
+    """
+    根据配置创建图片存储后端
+    
+    Args:
+        config (Dict): 完整配置字典
+        markdown_dir (Optional[str]): Markdown目录，本地存储以此生成相对路径
+    
+    Returns:
+        ImageStorage: 图片存储后端实例
+    """
+    storage_config = config.get('image_storage', {})
+    backend = storage_config.get('backend', 'remote')
+    upload_workers = storage_config.get('upload_workers', 4)
+    
+    if backend == 'remote':
+        remote = storage_config.get('remote', {})
+        kwargs = {'upload_workers': upload_workers}
+        if remote.get('api_url'):
+            kwargs['api_url'] = remote['api_url']
+        return ImageBed(config['auth']['token'], **kwargs)
+    
+    if backend == 'local':
+        local = storage_config.get('local', {})
+        root = local.get('path') or os.path.join(config['storage']['path'], 'images')
+        return LocalImageStorage(
+            root,
+            relative_to=markdown_dir,
+            url_prefix=local.get('url_prefix', ''),
+            upload_workers=upload_workers
+        )
+    
+    if backend == 's3':
+        s3 = storage_config.get('s3', {})
+        return S3ImageStorage(
+            bucket=s3.get('bucket', ''),
+            endpoint_url=s3.get('endpoint_url'),
+            access_key=s3.get('access_key'),
+            secret_key=s3.get('secret_key'),
+            region=s3.get('region'),
+            prefix=s3.get('prefix', 'images'),
+            public_url=s3.get('public_url'),
+            upload_workers=upload_workers
+        )
+    
+    raise ValueError(f"不支持的图片存储后端: {backend}")
 
 # 使用示例
 if __name__ == "__main__":
@@ -113,6 +462,6 @@ if __name__ == "__main__":
         # 删除图片
         status_code = image_bed.image_del(url)
         print(f"删除状态码: {status_code}")
-        
+    
     except Exception as e:
         print(f"操作失败: {str(e)}")
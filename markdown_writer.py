@@ -0,0 +1,378 @@
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 临时文件后缀
+TEMP_SUFFIX = '.tmp'
+
+# Markdown图片语法
+IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+
+
+def safe_filename(title: str) -> str:
+    """替换文件名中的非法字符"""
+    return re.sub(r'[<>:"/\\|?*]', '_', title)
+
+
+def _temp_path(path: str) -> str:
+    """目标文件同目录下的临时文件路径，每次调用都不同"""
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, f".{filename}.{os.getpid()}.{uuid.uuid4().hex[:12]}{TEMP_SUFFIX}")
+
+
+def atomic_write(path: str, text: str, fsync: bool = True):
+    """
+    原子写入文件：先写同目录下的临时文件，再改名覆盖目标文件
+    
+    Args:
+        path (str): 目标文件路径
+        text (str): 文件内容
+        fsync (bool): 改名前是否刷盘
+    """
+    path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = _temp_path(path)
+    try:
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+
+def rebase_image_links(text: str, old_dir: str, new_dir: str) -> str:
+    """
+    将Markdown中指向本地文件的相对图片路径改为相对于新目录
+    
+    Args:
+        text (str): Markdown内容
+        old_dir (str): 原文件所在目录
+        new_dir (str): 新位置所在目录
+    
+    Returns:
+        str: 处理后的内容
+    """
+    def replace(match):
+        url = match.group(2)
+        if not url or re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*:', url) or url.startswith(('/', '#')):
+            return match.group(0)
+        target = os.path.normpath(os.path.join(old_dir, url))
+        if not os.path.exists(target):
+            return match.group(0)
+        new_url = os.path.relpath(target, new_dir).replace(os.sep, '/')
+        return f"![{match.group(1)}]({new_url})"
+    return IMAGE_PATTERN.sub(replace, text)
+
+
+class MarkdownWriter:
+    """Markdown输出写入器
+    
+    - 支持按月份或ID分片存放，避免单个目录下文件过多
+    - 先写临时文件再改名，崩溃时不会留下写了一半的文件
+    - 批量fsync（组提交）：临时文件攒够一批或超过时间间隔后统一刷盘并改名
+    - 文件改名（提交）后才调用 write() 传入的回调，调用方应在回调中记录元信息，
+      保证元信息中不会出现尚未落盘的文件；每批文件的回调全部执行后再调用一次 on_flush，
+      调用方可在其中统一保存索引，而不是每个文件保存一次
+    """
+    
+    LAYOUTS = ('flat', 'month', 'id_prefix')
+    NAMINGS = ('title', 'id')
+    
+    def __init__(self, root: str, layout: str = 'flat', naming: str = 'title', shard_size: int = 1000,
+                 fsync: bool = True, fsync_batch: int = 32, fsync_interval: float = 5.0,
+                 on_flush: Optional[Callable[[List[str]], None]] = None):
+        """
+        初始化写入器
+        
+        Args:
+            root (str): Markdown根目录
+            layout (str): 目录布局，flat（不分片）/ month（按发布月份）/ id_prefix（按ID区间）
+            naming (str): 文件命名，title（标题_ID.md）/ id（ID.md，标题修改后路径不变）
+            shard_size (int): id_prefix布局下每个目录存放的ID区间大小
+            fsync (bool): 是否刷盘
+            fsync_batch (int): 每批刷盘的文件数（不刷盘时为每批调用 on_flush 的文件数）
+            fsync_interval (float): 待刷盘文件的最长等待时间（秒）
+            on_flush (Optional[Callable[[List[str]], None]]): 每批文件提交且各自的回调执行后调用，参数为本批提交的文件路径
+        """
+        if layout not in self.LAYOUTS:
+            raise ValueError(f"不支持的目录布局: {layout}")
+        if naming not in self.NAMINGS:
+            raise ValueError(f"不支持的文件命名方式: {naming}")
+        self.root = os.path.abspath(root)
+        self.layout = layout
+        self.naming = naming
+        self.shard_size = max(1, shard_size)
+        self.fsync = fsync
+        self.fsync_batch = max(1, fsync_batch)
+        self.fsync_interval = fsync_interval
+        self.on_flush = on_flush
+        self._pending: List[Tuple[str, str, Optional[Callable[[str], None]]]] = []  # (临时文件, 目标文件, 提交回调)
+        self._committed: List[str] = []  # 不刷盘时已直接改名、尚未通知 on_flush 的文件
+        self._pending_since: Optional[float] = None
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+    
+    def relative_path(self, content: Dict) -> str:
+        """
+        计算文章在根目录下的相对路径
+        
+        Args:
+            content (Dict): 文章信息，包含 id、title、created_time
+        
+        Returns:
+            str: 使用 / 分隔的相对路径
+        """
+        if self.naming == 'id':
+            filename = f"{content['id']}.md"
+        else:
+            filename = f"{safe_filename(content['title'])}_{content['id']}.md"
+        
+        if self.layout == 'month':
+            month = str(content.get('created_time') or '')[:7]
+            shard = month if re.match(r'^\d{4}-\d{2}$', month) else 'unknown'
+            return f"{shard}/{filename}"
+        if self.layout == 'id_prefix':
+            try:
+                shard = f"{int(content['id']) // self.shard_size:05d}"
+            except (TypeError, ValueError):
+                shard = 'other'
+            return f"{shard}/{filename}"
+        return filename
+    
+    def absolute_path(self, relative_path: str) -> str:
+        """相对路径转为绝对路径"""
+        return os.path.join(self.root, *relative_path.split('/'))
+    
+    def write(self, relative_path: str, text: str, on_commit: Optional[Callable[[str], None]] = None) -> str:
+        """
+        原子写入文件
+        
+        Args:
+            relative_path (str): 相对路径
+            text (str): 文件内容
+            on_commit (Optional[Callable[[str], None]]): 文件改名为目标文件后的回调，参数为目标文件路径
+        
+        Returns:
+            str: 目标文件绝对路径（开启fsync时，文件在所在批次刷盘后才出现）
+        """
+        target = self.absolute_path(relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # 同一目标在提交前可能被多次写入，每次写入使用独立的临时文件
+        temp = _temp_path(target)
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        
+        if not self.fsync:
+            os.replace(temp, target)
+            self._run_callback(on_commit, target)
+        
+        with self._pending_lock:
+            if self.fsync:
+                self._pending.append((temp, target, on_commit))
+            else:
+                self._committed.append(target)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            should_flush = (
+                len(self._pending) + len(self._committed) >= self.fsync_batch
+                or time.monotonic() - self._pending_since >= self.fsync_interval
+            )
+        if should_flush:
+            self.flush()
+        return target
+    
+    def flush(self):
+        """将待提交的文件刷盘并改名为目标文件"""
+        with self._flush_lock:
+            with self._pending_lock:
+                batch = self._pending
+                committed_before = self._committed
+                self._pending = []
+                self._committed = []
+                self._pending_since = None
+            if not batch:
+                if committed_before:
+                    self._run_flush_callback(committed_before)
+                return
+            
+            # 同一目标只保留最后一次写入
+            latest: Dict[str, Tuple[str, Optional[Callable[[str], None]]]] = {}
+            for temp, target, on_commit in batch:
+                previous = latest.get(target)
+                if previous:
+                    self._remove_quietly(previous[0])
+                latest[target] = (temp, on_commit)
+            
+            committed = []
+            directories = set()
+            for target, (temp, on_commit) in latest.items():
+                try:
+                    with open(temp, 'rb+') as f:
+                        os.fsync(f.fileno())
+                    os.replace(temp, target)
+                    directories.add(os.path.dirname(target))
+                    committed.append((target, on_commit))
+                except OSError as e:
+                    print(f"提交文件失败 {target}: {str(e)}")
+                    self._remove_quietly(temp)
+            
+            # 每个目录只刷盘一次，使改名操作持久化
+            for directory in directories:
+                self._fsync_dir(directory)
+            
+            # 文件持久化后再通知调用方
+            for target, on_commit in committed:
+                self._run_callback(on_commit, target)
+            if committed:
+                self._run_flush_callback([target for target, _ in committed])
+    
+    @staticmethod
+    def _run_callback(on_commit: Optional[Callable[[str], None]], target: str):
+        """调用提交回调，回调出错不影响其他文件"""
+        if on_commit is None:
+            return
+        try:
+            on_commit(target)
+        except Exception as e:
+            print(f"文件提交回调失败 {target}: {str(e)}")
+    
+    def _run_flush_callback(self, targets: List[str]):
+        """调用批次回调"""
+        if self.on_flush is None:
+            return
+        try:
+            self.on_flush(targets)
+        except Exception as e:
+            print(f"批次提交回调失败: {str(e)}")
+    
+    def recover(self, min_age: float = 3600):
+        """
+        清理崩溃遗留的临时文件
+        
+        Args:
+            min_age (float): 只清理修改时间早于该秒数的临时文件，避免误删其他进程正在写入的文件
+        """
+        now = time.time()
+        removed = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not (name.startswith('.') and name.endswith(TEMP_SUFFIX)):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    if now - os.path.getmtime(path) >= min_age:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        if removed:
+            print(f"已清理遗留临时文件: {removed} 个")
+    
+    def migrate(self, articles: Dict[str, Dict]) -> int:
+        """
+        按当前布局迁移已有文件，并更新文章元信息中的 path
+        
+        未记录 path 的旧数据按原来的平铺命名（标题_ID.md）查找。
+        
+        Args:
+            articles (Dict[str, Dict]): 文章ID到元信息的映射（会被原地修改）
+        
+        Returns:
+            int: 更新的记录数
+        """
+        changed = 0
+        moved = 0
+        for meta in articles.values():
+            if 'id' not in meta:
+                continue
+            new_rel = self.relative_path(meta)
+            old_rel = meta.get('path')
+            if not old_rel and meta.get('title') is not None:
+                old_rel = f"{safe_filename(meta['title'])}_{meta['id']}.md"
+            if not old_rel or old_rel == new_rel:
+                if old_rel and meta.get('path') != old_rel:
+                    meta['path'] = old_rel
+                    changed += 1
+                continue
+            
+            old_path = self.absolute_path(old_rel)
+            new_path = self.absolute_path(new_rel)
+            if os.path.exists(old_path):
+                if not os.path.exists(new_path):
+                    self._move(old_path, new_path)
+                    moved += 1
+                else:
+                    self._remove_quietly(old_path)
+                self._prune_empty_dirs(os.path.dirname(old_path))
+            elif not os.path.exists(new_path):
+                # 文件不存在时保留原记录
+                continue
+            meta['path'] = new_rel
+            changed += 1
+        
+        if moved:
+            print(f"已按 {self.layout}/{self.naming} 布局迁移文件: {moved} 个")
+        return changed
+    
+    def _move(self, old_path: str, new_path: str):
+        """
+        移动文件，并修正其中指向本地文件的相对图片路径
+        
+        需要修改内容时先原子写入新位置再删除旧文件，中途崩溃时旧文件保持完整，
+        下次迁移发现新文件已存在会直接删除旧文件。
+        """
+        old_dir = os.path.dirname(old_path)
+        new_dir = os.path.dirname(new_path)
+        os.makedirs(new_dir, exist_ok=True)
+        if old_dir != new_dir:
+            with open(old_path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            rebased = rebase_image_links(text, old_dir, new_dir)
+            if rebased != text:
+                atomic_write(new_path, rebased, fsync=self.fsync)
+                os.remove(old_path)
+                return
+        os.replace(old_path, new_path)
+    
+    def _prune_empty_dirs(self, directory: str):
+        """删除迁移后留下的空分片目录（不删除根目录）"""
+        directory = os.path.abspath(directory)
+        while directory != self.root and directory.startswith(self.root + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+    
+    @staticmethod
+    def _fsync_dir(directory: str):
+        """刷新目录元数据（Windows不支持，忽略）"""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+    
+    @staticmethod
+    def _remove_quietly(path: str):
+        """删除文件，忽略错误"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
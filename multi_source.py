@@ -0,0 +1,299 @@
+import copy
+import os
+import threading
+import requests
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Deque, Dict, List, Tuple
+from blog_crawler import BlogCrawler, resolve_source
+from profiler import create_profiler
+
+
+class FairScheduler:
+    """多源公平调度器：所有源共享一个线程池，按源轮转分配工作线程"""
+    
+    def __init__(self, max_workers: int):
+        """
+        初始化调度器
+        
+        Args:
+            max_workers (int): 共享线程池的最大线程数
+        """
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fair-worker')
+        self._queues: Dict[str, Deque[Tuple[Future, Callable, tuple, dict]]] = {}
+        self._ready: Deque[str] = deque()  # 有待执行任务的源，按轮转顺序排列
+        self._running: Dict[str, int] = {}
+        self._limits: Dict[str, int] = {}
+        self._inflight = 0
+        self._lock = threading.Lock()
+    
+    def set_limit(self, source: str, max_workers: int):
+        """
+        设置单个源可同时占用的线程数上限
+        
+        Args:
+            source (str): 源名称
+            max_workers (int): 线程数上限，小于等于0表示不限制
+        """
+        with self._lock:
+            self._limits[source] = max_workers if max_workers > 0 else self.max_workers
+        self._dispatch()
+    
+    def for_source(self, source: str) -> 'SourceExecutor':
+        """
+        获取绑定到指定源的执行器
+        
+        Args:
+            source (str): 源名称
+        
+        Returns:
+            SourceExecutor: 与ThreadPoolExecutor接口兼容的执行器
+        """
+        return SourceExecutor(self, source)
+    
+    def submit(self, source: str, fn: Callable, *args, **kwargs) -> Future:
+        """
+        提交任务
+        
+        Args:
+            source (str): 任务所属的源
+            fn (Callable): 任务函数
+        
+        Returns:
+            Future: 任务结果
+        """
+        future: Future = Future()
+        with self._lock:
+            queue = self._queues.setdefault(source, deque())
+            if not queue:
+                self._ready.append(source)
+            queue.append((future, fn, args, kwargs))
+        self._dispatch()
+        return future
+    
+    def _dispatch(self):
+        """在空闲线程范围内，按源轮转取出任务执行"""
+        to_run = []
+        with self._lock:
+            while self._inflight < self.max_workers and self._ready:
+                picked = None
+                for _ in range(len(self._ready)):
+                    source = self._ready[0]
+                    # 轮转：当前源移到队尾
+                    self._ready.rotate(-1)
+                    if self._running.get(source, 0) < self._limits.get(source, self.max_workers):
+                        picked = source
+                        break
+                if picked is None:
+                    # 所有有任务的源都已达到各自上限
+                    break
+                queue = self._queues[picked]
+                to_run.append((picked, queue.popleft()))
+                if not queue:
+                    self._ready.remove(picked)
+                self._running[picked] = self._running.get(picked, 0) + 1
+                self._inflight += 1
+        for source, task in to_run:
+            self._executor.submit(self._run, source, task)
+    
+    def _run(self, source: str, task: Tuple[Future, Callable, tuple, dict]):
+        """执行单个任务并在结束后继续调度"""
+        future, fn, args, kwargs = task
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            with self._lock:
+                self._running[source] -= 1
+                self._inflight -= 1
+            self._dispatch()
+    
+    def shutdown(self, wait: bool = True):
+        """关闭共享线程池"""
+        with self._lock:
+            for queue in self._queues.values():
+                for future, _, _, _ in queue:
+                    future.cancel()
+                queue.clear()
+            self._ready.clear()
+        self._executor.shutdown(wait=wait)
+
+
+class SourceExecutor:
+    """绑定到单个源的执行器，供BlogCrawler替代独立线程池使用"""
+    
+    def __init__(self, scheduler: FairScheduler, source: str):
+        self.scheduler = scheduler
+        self.source = source
+    
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """提交任务到共享调度器"""
+        return self.scheduler.submit(self.source, fn, *args, **kwargs)
+    
+    def shutdown(self, wait: bool = True):
+        """共享线程池由调度器统一关闭，这里不做处理"""
+        pass
+
+
+def build_source_config(config: Dict, source: Dict) -> Dict:
+    """
+    根据全局配置和单个源的配置生成该源的爬虫配置
+    
+    Args:
+        config (Dict): 全局配置
+        source (Dict): 源配置
+    
+    Returns:
+        Dict: 该源使用的完整配置
+    """
+    source_config = copy.deepcopy(config)
+    name = source['name']
+    # 未配置origin/referer时从base_url推导（与单源模式一致）
+    source_config['source'] = resolve_source(
+        {key: source.get(key) for key in ('name', 'base_url', 'origin', 'referer')}
+    )
+    for key in ('interval', 'min_interval', 'max_interval'):
+        if source.get(key):
+            source_config['monitor'][key] = source[key]
+    if source.get('rate_limit'):
+        source_config['rate_limit'].update(source['rate_limit'])
+    # 每个源使用独立的存储命名空间
+    source_config['storage']['path'] = source.get('storage') or os.path.join(config['storage']['path'], name)
+    # 指定了HTML输出目录时，各源使用其中的子目录
+    render_config = source_config.get('render')
+    if render_config and render_config.get('output'):
+        render_config['output'] = os.path.join(render_config['output'], name)
+    return source_config
+
+
+def validate_sources(sources: List[Dict]):
+    """
+    校验多源配置
+    
+    Args:
+        sources (List[Dict]): 源配置列表
+    """
+    names = set()
+    for index, source in enumerate(sources):
+        if not isinstance(source, dict):
+            raise ValueError(f"sources[{index}] 配置格式错误")
+        for key in ('name', 'base_url'):
+            if not source.get(key):
+                raise ValueError(f"缺少必要的配置项: sources[{index}].{key}")
+        if source['name'] in names:
+            raise ValueError(f"源名称重复: {source['name']}")
+        names.add(source['name'])
+
+
+class MultiSourceWatcher:
+    """多源监控：在一个进程中监控多个博客，共享线程池和连接池"""
+    
+    def __init__(self, config: Dict, work_queue=None):
+        """
+        初始化多源监控
+        
+        Args:
+            config (Dict): 全局配置，sources 为源配置列表
+            work_queue: 任务队列（协调者模式），所有源共用
+        """
+        sources = config['sources']
+        validate_sources(sources)
+        
+        max_workers = config['thread_pool']['max_workers']
+        self.scheduler = FairScheduler(max_workers)
+        
+        # 所有源共享同一个连接池
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=max(len(sources), 1),
+            pool_maxsize=max_workers
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # 所有源共用一个分析器：周期数和采样比例按整个进程计算，报告保存在 <storage.path>/profiles
+        self.profiler = create_profiler(config, config['storage']['path'])
+        
+        self.crawlers: Dict[str, BlogCrawler] = {}
+        for source in sources:
+            name = source['name']
+            self.scheduler.set_limit(name, source.get('max_workers', 0))
+            self.crawlers[name] = BlogCrawler(
+                build_source_config(config, source),
+                executor=self.scheduler.for_source(name),
+                session=self.session,
+                work_queue=work_queue,
+                profiler=self.profiler
+            )
+        self._stop = threading.Event()
+    
+    def _run_all(self, fn: Callable[[BlogCrawler], object]) -> Dict[str, object]:
+        """在各源独立的线程中并行执行操作，文章下载任务由共享调度器分配"""
+        results: Dict[str, object] = {}
+        with ThreadPoolExecutor(max_workers=len(self.crawlers), thread_name_prefix='source') as pool:
+            futures = {pool.submit(fn, crawler): name for name, crawler in self.crawlers.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"[{name}] 执行失败: {str(e)}")
+                    results[name] = None
+        return results
+    
+    def check_all(self, auto_download: bool = True):
+        """对所有源执行一次检查"""
+        self._run_all(lambda crawler: crawler.run_check(auto_download))
+    
+    def crawl_all(self, force_download: bool = False) -> Dict[str, List[str]]:
+        """
+        对所有源执行增量下载
+        
+        Args:
+            force_download (bool): 是否强制重新下载
+        
+        Returns:
+            Dict[str, List[str]]: 各源保存的文件列表
+        """
+        return self._run_all(lambda crawler: crawler.crawl_incremental(force_download=force_download))
+    
+    def watch(self, auto_download: bool = True):
+        """
+        启动所有源的监控，每个源按各自的间隔独立轮询
+        
+        Args:
+            auto_download (bool): 发现更新时是否自动下载
+        """
+        threads = []
+        for name, crawler in self.crawlers.items():
+            thread = threading.Thread(
+                target=crawler.watch,
+                args=(auto_download, self._stop),
+                name=f"watch-{name}",
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+        
+        print(f"多源监控已启动，共 {len(threads)} 个源")
+        try:
+            while any(thread.is_alive() for thread in threads):
+                self._stop.wait(1)
+        except KeyboardInterrupt:
+            print("\n监控服务已停止")
+        finally:
+            self.stop()
+    
+    def stop(self):
+        """停止监控并释放资源"""
+        self._stop.set()
+        for crawler in self.crawlers.values():
+            crawler.wake()
+        self.scheduler.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
+# 一周的小时数
+HOURS_PER_WEEK = 7 * 24
+
+
+class AdaptivePollScheduler:
+    """自适应轮询调度器
+    
+    根据历史文章的发布时间学习发布规律（按一周中的小时统计，近期文章权重更高），
+    在活跃时段缩短检查间隔，在安静时段以及连续未发现更新时逐步延长间隔，
+    间隔始终限制在 [min_interval, max_interval] 之间。
+    """
+    
+    def __init__(self, base_interval: float, min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None, adaptive: bool = True,
+                 backoff: float = 1.5, half_life_days: float = 180, active_threshold: float = 0.5):
+        """
+        初始化调度器
+        
+        Args:
+            base_interval (float): 基础检查间隔（秒），没有历史数据或关闭自适应时使用
+            min_interval (Optional[float]): 最小检查间隔（秒）
+            max_interval (Optional[float]): 最大检查间隔（秒）
+            adaptive (bool): 是否启用自适应
+            backoff (float): 连续未发现更新时的间隔增长倍数
+            half_life_days (float): 历史文章权重的半衰期（天）
+            active_threshold (float): 活跃度达到该值的时段视为活跃时段
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval or base_interval
+        self.max_interval = max(max_interval or base_interval, self.min_interval)
+        self.adaptive = adaptive
+        self.backoff = max(1.0, backoff)
+        self.half_life_days = half_life_days
+        self.active_threshold = active_threshold
+        self.miss_streak = 0
+        self._profile: List[float] = []
+    
+    def learn(self, created_times: Iterable[str], now: Optional[datetime] = None):
+        """
+        根据文章发布时间学习发布规律
+        
+        Args:
+            created_times (Iterable[str]): ISO格式的发布时间列表
+            now (Optional[datetime]): 当前时间，默认为当前UTC时间
+        """
+        now = now or datetime.now(timezone.utc)
+        week = [0.0] * HOURS_PER_WEEK
+        day = [0.0] * 24
+        for value in created_times:
+            created = self._parse_time(value)
+            if created is None:
+                continue
+            age_days = max((now - created).total_seconds() / 86400, 0)
+            weight = 0.5 ** (age_days / self.half_life_days)
+            week[self._hour_of_week(created)] += weight
+            day[created.hour] += weight
+        
+        if not any(week):
+            self._profile = []
+            return
+        
+        # 一周中的小时分布为主，按天的小时分布补充样本较少的时段
+        raw = [week[h] + day[h % 24] / 7 for h in range(HOURS_PER_WEEK)]
+        # 环形平滑，相邻小时互相分摊
+        smoothed = [
+            0.25 * raw[h - 1] + 0.5 * raw[h] + 0.25 * raw[(h + 1) % HOURS_PER_WEEK]
+            for h in range(HOURS_PER_WEEK)
+        ]
+        peak = max(smoothed)
+        self._profile = [value / peak for value in smoothed]
+    
+    def activity(self, moment: datetime) -> float:
+        """
+        获取指定时刻的活跃度
+        
+        Args:
+            moment (datetime): 时刻（带时区）
+        
+        Returns:
+            float: 活跃度，0~1，没有历史数据时返回0
+        """
+        if not self._profile:
+            return 0.0
+        return self._profile[self._hour_of_week(moment.astimezone(timezone.utc))]
+    
+    def record_check(self, found_updates: bool):
+        """
+        记录一次检查结果
+        
+        Args:
+            found_updates (bool): 本次是否发现更新
+        """
+        self.miss_streak = 0 if found_updates else self.miss_streak + 1
+    
+    def next_interval(self, now: Optional[datetime] = None) -> float:
+        """
+        计算距离下次检查的间隔
+        
+        Args:
+            now (Optional[datetime]): 当前时间，默认为当前UTC时间
+        
+        Returns:
+            float: 间隔秒数
+        """
+        if not self.adaptive:
+            return self.base_interval
+        if not self._profile:
+            return self._clamp(self.base_interval * self.backoff ** self.miss_streak)
+        
+        now = now or datetime.now(timezone.utc)
+        score = self.activity(now)
+        interval = self.max_interval - (self.max_interval - self.min_interval) * score
+        # 非活跃时段连续未发现更新时逐步退避
+        if score < self.active_threshold:
+            interval *= self.backoff ** self.miss_streak
+        interval = self._clamp(interval)
+        
+        # 不要睡过下一个活跃时段的开始
+        if score < self.active_threshold:
+            next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            while next_hour < now + timedelta(seconds=interval):
+                if self.activity(next_hour) >= self.active_threshold:
+                    interval = self._clamp((next_hour - now).total_seconds())
+                    break
+                next_hour += timedelta(hours=1)
+        return interval
+    
+    def _clamp(self, interval: float) -> float:
+        """限制在最小和最大间隔之间"""
+        return min(max(interval, self.min_interval), self.max_interval)
+    
+    @staticmethod
+    def _hour_of_week(moment: datetime) -> int:
+        """一周中的第几个小时（周一0点为0）"""
+        return moment.weekday() * 24 + moment.hour
+    
+    @staticmethod
+    def _parse_time(value: str) -> Optional[datetime]:
+        """解析ISO时间，统一转换为UTC"""
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        # 不带时区的时间视为本地时间
+        if parsed.tzinfo is None:
+            parsed = parsed.astimezone()
+        return parsed.astimezone(timezone.utc)
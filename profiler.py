@@ -0,0 +1,419 @@
+import cProfile
+import contextlib
+import functools
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+# cProfile在Python 3.12+中基于sys.monitoring，同一时间只能有一个实例启用
+_cprofile_lock = threading.Lock()
+
+# tracemalloc是全局的，多个源同时分析时按引用计数启停
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+# 每个周期生成的报告文件后缀
+REPORT_SUFFIXES = ('.pstats', '.collapsed', '.alloc.txt', '.txt')
+
+
+class _StackSampler(threading.Thread):
+    """采样线程：定时读取所有线程的调用栈并按折叠格式计数"""
+    
+    def __init__(self, interval: float):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+    
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+    
+    def _sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)).replace(';', '_'))
+            stack.reverse()
+            self.counts[';'.join(stack)] += 1
+        self.samples += 1
+
+
+class _NullCycle:
+    """未被采样的周期，不做任何分析"""
+    
+    active = False
+    
+    def allocations(self):
+        return contextlib.nullcontext()
+
+
+class _ProfiledCycle:
+    """一次被分析的周期：CPU分析贯穿整个周期，内存分析只覆盖 allocations() 包裹的部分
+    
+    cProfile只分析启用它的线程，因此cprofile模式下通过 wrap() 提交到线程池的任务
+    各自使用独立的cProfile实例，结束后合并到本周期的统计中。
+    """
+    
+    active = True
+    
+    def __init__(self, profiler: 'CycleProfiler', prefix: str):
+        self.profiler = profiler
+        self.prefix = prefix
+        self.started = time.monotonic()
+        self.duration = 0.0
+        self.cprofile: Optional[cProfile.Profile] = None
+        self.thread_ident = threading.get_ident()
+        self.task_stats: Optional[pstats.Stats] = None
+        self.task_count = 0
+        self._task_lock = threading.Lock()
+        self._stopped = False
+        self.sampler: Optional[_StackSampler] = None
+        self.alloc_report: Optional[str] = None
+    
+    def start(self):
+        if self.profiler.mode == 'cprofile':
+            if _cprofile_lock.acquire(blocking=False):
+                self.cprofile = cProfile.Profile()
+                try:
+                    self.cprofile.enable()
+                except ValueError as e:
+                    # 其他分析工具（如调试器）已启用
+                    print(f"无法启用cProfile: {str(e)}")
+                    self.cprofile = None
+                    _cprofile_lock.release()
+            else:
+                print("其他周期正在使用cProfile，本周期跳过CPU分析")
+        else:
+            self.sampler = _StackSampler(self.profiler.interval)
+            self.sampler.start()
+    
+    def stop(self):
+        self.duration = time.monotonic() - self.started
+        with self._task_lock:
+            self._stopped = True
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            _cprofile_lock.release()
+        if self.sampler is not None:
+            self.sampler.stop()
+    
+    def run_task(self, fn: Callable, *args, **kwargs):
+        """在线程池线程中用独立的cProfile执行任务，结束后合并统计"""
+        if threading.get_ident() == self.thread_ident:
+            # 与周期同一线程执行时已被周期的cProfile覆盖
+            return fn(*args, **kwargs)
+        task_profile = cProfile.Profile()
+        try:
+            task_profile.enable()
+        except ValueError:
+            # Python 3.12+ 同一时间只能启用一个cProfile
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            task_profile.disable()
+            self._add_task_profile(task_profile)
+    
+    def _add_task_profile(self, task_profile: cProfile.Profile):
+        """合并任务的统计（周期结束后完成的任务忽略）"""
+        with self._task_lock:
+            if self._stopped:
+                return
+            if self.task_stats is None:
+                self.task_stats = pstats.Stats(task_profile)
+            else:
+                self.task_stats.add(task_profile)
+            self.task_count += 1
+    
+    @contextlib.contextmanager
+    def allocations(self):
+        """在包裹的代码前后各拍一次tracemalloc快照，记录净增长最多的分配位置"""
+        if not self.profiler.trace_allocations:
+            yield
+            return
+        _start_tracemalloc(self.profiler.trace_frames)
+        try:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            try:
+                yield
+            finally:
+                after = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                self.alloc_report = self._format_allocations(before, after, current, peak)
+        finally:
+            _stop_tracemalloc()
+    
+    def _format_allocations(self, before, after, current: int, peak: int) -> str:
+        """生成内存分配报告"""
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ]
+        stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+        lines = [
+            f"当前跟踪内存: {current / 1024 / 1024:.2f} MB",
+            f"峰值跟踪内存: {peak / 1024 / 1024:.2f} MB",
+            f"净增长最多的 {self.profiler.top_allocators} 处分配:",
+        ]
+        for stat in stats[:self.profiler.top_allocators]:
+            lines.append(str(stat))
+        return "\n".join(lines) + "\n"
+    
+    def write_reports(self):
+        """写入本周期的报告文件"""
+        written = []
+        summary = [f"周期: {os.path.basename(self.prefix)}", f"耗时: {self.duration:.2f} 秒"]
+        
+        if self.cprofile is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(self.cprofile, stream=stream)
+            with self._task_lock:
+                if self.task_stats is not None:
+                    stats.add(self.task_stats)
+            stats.dump_stats(self.prefix + '.pstats')
+            written.append('.pstats')
+            summary.append(f"线程池任务: {self.task_count} 个（已合并到统计中）")
+            stats.sort_stats('cumulative').print_stats(self.profiler.top_functions)
+            summary.append(stream.getvalue())
+        
+        if self.sampler is not None:
+            with open(self.prefix + '.collapsed', 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self.sampler.counts.items()):
+                    f.write(f"{stack} {count}\n")
+            written.append('.collapsed')
+            summary.append(self._format_samples())
+        
+        with open(self.prefix + '.txt', 'w', encoding='utf-8') as f:
+            f.write("\n".join(summary) + "\n")
+        written.append('.txt')
+        
+        if self.alloc_report is not None:
+            with open(self.prefix + '.alloc.txt', 'w', encoding='utf-8') as f:
+                f.write(self.alloc_report)
+            written.append('.alloc.txt')
+        return written
+    
+    def _format_samples(self) -> str:
+        """汇总采样结果：按自身采样数和累计采样数排列的函数"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.sampler.counts.items():
+            frames = stack.split(';')[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        
+        top = self.profiler.top_functions
+        lines = [f"采样次数: {self.sampler.samples} (间隔 {self.profiler.interval} 秒，包含所有线程)", "", "自身采样最多的函数:"]
+        lines += [f"{count:8d}  {frame}" for frame, count in own.most_common(top)]
+        lines += ["", "累计采样最多的函数:"]
+        lines += [f"{count:8d}  {frame}" for frame, count in total.most_common(top)]
+        return "\n".join(lines)
+
+
+def _start_tracemalloc(frames: int):
+    """开始跟踪内存分配（已由外部启动时沿用）"""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    """最后一个使用者结束后停止跟踪，释放跟踪开销"""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+class CycleProfiler:
+    """抓取周期性能分析器
+    
+    - sampling：采样分析，定时读取所有线程的调用栈，开销低，输出可直接生成火焰图的折叠栈
+    - cprofile：确定性分析，输出 .pstats 文件，开销较高，适合短时间排查；
+      覆盖执行周期的线程和通过 wrap() 提交的任务，其他线程（如图片上传线程池）不在统计中
+    - 被分析的周期在 allocations() 包裹的部分前后拍摄tracemalloc快照，记录净增长最多的分配位置
+    - 按 sample_rate 随机抽取周期进行分析，可长期开启；报告按周期轮转，只保留最近 keep 个
+    """
+    
+    MODES = ('sampling', 'cprofile')
+    
+    def __init__(self, output_dir: str, enabled: bool = True, mode: str = 'sampling',
+                 cycles: int = 0, sample_rate: float = 1.0, interval: float = 0.01,
+                 trace_allocations: bool = True, trace_frames: int = 1,
+                 top_allocators: int = 25, top_functions: int = 40, keep: int = 50):
+        """
+        初始化分析器
+        
+        Args:
+            output_dir (str): 报告目录
+            enabled (bool): 是否启用
+            mode (str): 分析方式，sampling / cprofile
+            cycles (int): 最多分析的周期数，0表示不限制
+            sample_rate (float): 每个周期被分析的概率，0~1
+            interval (float): 采样间隔（秒）
+            trace_allocations (bool): 是否跟踪内存分配
+            trace_frames (int): tracemalloc记录的调用栈深度
+            top_allocators (int): 报告中列出的分配位置数
+            top_functions (int): 报告中列出的函数数
+            keep (int): 保留最近多少个周期的报告，0表示不清理
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的分析方式: {mode}")
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self.mode = mode
+        self.cycles = max(0, cycles)
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.interval = max(interval, 0.001)
+        self.trace_allocations = trace_allocations
+        self.trace_frames = max(1, trace_frames)
+        self.top_allocators = top_allocators
+        self.top_functions = top_functions
+        self.keep = max(0, keep)
+        self.profiled = 0
+        self._lock = threading.Lock()
+        # 执行周期的线程ID -> 进行中的cprofile周期（多源共用分析器时各源的周期在各自线程中执行）
+        self._cprofile_cycles: Dict[int, _ProfiledCycle] = {}
+        if enabled and mode == 'cprofile':
+            print("提示: cprofile模式只分析检查线程和文章下载任务，图片上传等其他线程请使用sampling模式")
+    
+    def _should_profile(self) -> bool:
+        """按剩余周期数和采样比例决定本周期是否分析"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self.cycles and self.profiled >= self.cycles:
+                return False
+            if random.random() >= self.sample_rate:
+                return False
+            self.profiled += 1
+            return True
+    
+    @contextlib.contextmanager
+    def cycle(self, label: str):
+        """
+        分析一个周期
+        
+        Args:
+            label (str): 周期标签，用于报告文件名
+        
+        Yields:
+            周期对象，可用其 allocations() 包裹需要跟踪内存分配的部分
+        """
+        if not self._should_profile():
+            yield _NullCycle()
+            return
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)
+        cycle = _ProfiledCycle(self, os.path.join(self.output_dir, f"{stamp}_{safe_label}"))
+        cycle.start()
+        if cycle.cprofile is not None:
+            with self._lock:
+                self._cprofile_cycles[cycle.thread_ident] = cycle
+        try:
+            yield cycle
+        finally:
+            with self._lock:
+                if self._cprofile_cycles.get(cycle.thread_ident) is cycle:
+                    del self._cprofile_cycles[cycle.thread_ident]
+            cycle.stop()
+            try:
+                written = cycle.write_reports()
+                print(f"性能分析报告已保存: {cycle.prefix}{{{','.join(written)}}} (耗时 {cycle.duration:.2f} 秒)")
+                self._rotate()
+            except Exception as e:
+                print(f"保存性能分析报告失败: {str(e)}")
+    
+    def wrap(self, fn: Callable) -> Callable:
+        """
+        包装提交到线程池的任务，当前线程有进行中的cprofile周期时任务的调用也计入该周期的统计
+        
+        需要在执行周期的线程中调用，其他源的任务不会计入本周期。
+        
+        Args:
+            fn (Callable): 任务函数
+        
+        Returns:
+            Callable: 包装后的函数（当前线程没有进行中的cprofile周期时返回原函数）
+        """
+        with self._lock:
+            cycle = self._cprofile_cycles.get(threading.get_ident())
+        if cycle is None:
+            return fn
+        return functools.partial(cycle.run_task, fn)
+    
+    def _rotate(self):
+        """只保留最近 keep 个周期的报告"""
+        if not self.keep:
+            return
+        groups: Dict[str, list] = {}
+        for name in os.listdir(self.output_dir):
+            for suffix in REPORT_SUFFIXES:
+                if name.endswith(suffix):
+                    groups.setdefault(name[:-len(suffix)], []).append(name)
+                    break
+        for prefix in sorted(groups)[:-self.keep]:
+            for name in groups[prefix]:
+                try:
+                    os.remove(os.path.join(self.output_dir, name))
+                except OSError:
+                    pass
+
+
+def create_profiler(config: Dict, storage_dir: str) -> CycleProfiler:
+    """
+    根据配置创建分析器（未启用时返回不做任何分析的实例）
+    
+    Args:
+        config (Dict): 完整配置
+        storage_dir (str): 存储目录，报告默认保存在其下的 profiles 目录
+    
+    Returns:
+        CycleProfiler: 分析器
+    """
+    profile_config = config.get('profile', {})
+    return CycleProfiler(
+        profile_config.get('output') or os.path.join(storage_dir, 'profiles'),
+        enabled=profile_config.get('enabled', False),
+        mode=profile_config.get('mode', 'sampling'),
+        cycles=profile_config.get('cycles', 0),
+        sample_rate=profile_config.get('sample_rate', 1.0),
+        interval=profile_config.get('interval', 0.01),
+        trace_allocations=profile_config.get('tracemalloc', True),
+        trace_frames=profile_config.get('tracemalloc_frames', 1),
+        top_allocators=profile_config.get('top_allocators', 25),
+        keep=profile_config.get('keep', 50)
+    )
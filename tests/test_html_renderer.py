@@ -0,0 +1,68 @@
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import markdown  # noqa: F401
+except ImportError:
+    markdown = None
+
+from html_renderer import _render_page
+
+
+@unittest.skipIf(markdown is None, '需要安装markdown')
+class RenderPageTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def render(self, text, allow_html=False):
+        source = os.path.join(self.tmpdir, 'a.md')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(text)
+        job = {
+            'source': source,
+            'target': os.path.join(self.tmpdir, 'out', 'a.html'),
+            'title': 't',
+            'created_time': '2025-01-01',
+            'month': '2025-01',
+            'css': os.path.join(self.tmpdir, 'out', 'style.css'),
+            'month_page': os.path.join(self.tmpdir, 'out', 'months', '2025-01.html'),
+            'index_page': os.path.join(self.tmpdir, 'out', 'index.html'),
+            'allow_html': allow_html
+        }
+        with open(_render_page(job), 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def test_raw_html_is_escaped(self):
+        page = self.render('<script>alert(1)</script>\n\ntext <b onclick="x()">b</b>\n')
+        self.assertNotIn('<script>', page)
+        self.assertIsNone(re.search(r'<[^>]*\son\w+=', page))
+        self.assertIn('&lt;script&gt;', page)
+    
+    def test_attr_list_cannot_add_attributes(self):
+        page = self.render('[x](http://a){: onclick="alert(2)"}\n\n# t {: onmouseover="alert(3)" }\n')
+        # 属性语法按普通文本输出，任何标签都不带事件属性
+        self.assertIsNone(re.search(r'<[^>]*\son\w+=', page))
+        self.assertIn('<a href="http://a">x</a>', page)
+    
+    def test_unsafe_urls_are_removed(self):
+        page = self.render('[x](javascript:alert(1)) ![i](data:image/png;base64,AAAA)\n')
+        self.assertIn('<a href="#">x</a>', page)
+        self.assertIn('src="data:image/png;base64,AAAA"', page)
+    
+    def test_allow_html_keeps_markup(self):
+        page = self.render('<div class="k">x</div>\n\n[x](http://a){: .c}\n', allow_html=True)
+        self.assertIn('<div class="k">x</div>', page)
+        self.assertIn('class="c"', page)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from markdown_writer import MarkdownWriter
+
+
+class MarkdownWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.writer = MarkdownWriter(self.tmpdir, fsync=True, fsync_batch=10, fsync_interval=60)
+        self.committed = []
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_write_is_committed_on_flush(self):
+        target = self.writer.write('a.md', 'one', self.committed.append)
+        self.assertFalse(os.path.exists(target))
+        self.assertEqual(self.committed, [])
+        self.writer.flush()
+        with open(target, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'one')
+        self.assertEqual(self.committed, [target])
+    
+    def test_repeated_write_keeps_last(self):
+        # 同一线程在刷盘前两次写入同一文件
+        self.writer.write('a.md', 'one', self.committed.append)
+        target = self.writer.write('a.md', 'two', self.committed.append)
+        self.writer.flush()
+        with open(target, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'two')
+        self.assertEqual(self.committed, [target])
+        self.assertEqual(os.listdir(self.tmpdir), ['a.md'])
+
+    
+    def test_on_flush_runs_once_per_batch(self):
+        for fsync in (True, False):
+            flushed = []
+            writer = MarkdownWriter(os.path.join(self.tmpdir, str(fsync)), fsync=fsync, fsync_batch=3,
+                                    fsync_interval=60, on_flush=flushed.append)
+            for i in range(7):
+                writer.write(f"{i}.md", str(i))
+            writer.flush()
+            self.assertEqual([len(batch) for batch in flushed], [3, 3, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
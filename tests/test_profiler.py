@@ -0,0 +1,56 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiler import CycleProfiler
+
+
+class CycleProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def test_cycles_limit(self):
+        profiler = CycleProfiler(self.tmpdir, mode='sampling', cycles=2, trace_allocations=False)
+        active = []
+        for i in range(4):
+            with profiler.cycle(f"c{i}") as cycle:
+                active.append(cycle.active)
+        self.assertEqual(active, [True, True, False, False])
+    
+    def test_wrap_only_uses_cycle_of_current_thread(self):
+        profiler = CycleProfiler(self.tmpdir, mode='cprofile', trace_allocations=False)
+        wrapped = {}
+        in_cycle = threading.Event()
+        done = threading.Event()
+        
+        def other_source():
+            # 另一个源的线程在 A 的周期进行中提交任务
+            in_cycle.wait()
+            wrapped['other'] = profiler.wrap(len)
+            done.set()
+        
+        thread = threading.Thread(target=other_source)
+        thread.start()
+        with profiler.cycle('a') as cycle:
+            in_cycle.set()
+            done.wait()
+            wrapped['own'] = profiler.wrap(len)
+            profiled = cycle.cprofile is not None
+        thread.join()
+        
+        self.assertIs(wrapped['other'], len)
+        if profiled:
+            self.assertIsNot(wrapped['own'], len)
+        self.assertIs(profiler.wrap(len), len)
+
+
+if __name__ == '__main__':
+    unittest.main()
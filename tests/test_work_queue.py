@@ -0,0 +1,212 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from work_queue import DONE, FAILED, LEASED, PENDING, MemoryWorkQueue, QueueWorker, SQLiteWorkQueue
+
+
+class WorkQueueContract:
+    """两种队列后端共用的行为测试"""
+    
+    def make_queue(self, lease_seconds=300, max_attempts=3):
+        raise NotImplementedError
+    
+    def setUp(self):
+        self.queue = self.make_queue()
+    
+    def test_enqueue_is_deduplicated(self):
+        self.assertTrue(self.queue.enqueue('s:1', 's', {'id': 1}))
+        self.assertFalse(self.queue.enqueue('s:1', 's', {'id': 1}))
+        self.assertEqual(self.queue.stats(), {PENDING: 1})
+    
+    def test_claim_leases_job_once(self):
+        self.queue.enqueue('s:1', 's', {'id': 1, 'type': 'section'})
+        jobs = self.queue.claim('w1', 5)
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]['payload'], {'id': 1, 'type': 'section'})
+        self.assertEqual(jobs[0]['attempts'], 1)
+        # 租约有效期内其他工作者领取不到
+        self.assertEqual(self.queue.claim('w2', 5), [])
+        self.assertEqual(self.queue.get_jobs(['s:1'])['s:1']['status'], LEASED)
+    
+    def test_claim_respects_limit_and_order(self):
+        for i in range(3):
+            self.queue.enqueue(f's:{i}', 's', {'id': i})
+            time.sleep(0.01)
+        self.assertEqual([job['id'] for job in self.queue.claim('w1', 2)], ['s:0', 's:1'])
+        self.assertEqual([job['id'] for job in self.queue.claim('w1', 2)], ['s:2'])
+    
+    def test_expired_lease_is_reclaimed(self):
+        self.queue = self.make_queue(lease_seconds=0.05)
+        self.queue.enqueue('s:1', 's', {'id': 1})
+        self.assertEqual(len(self.queue.claim('w1')), 1)
+        time.sleep(0.1)
+        jobs = self.queue.claim('w2')
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]['attempts'], 2)
+        # 原工作者已失去租约
+        self.assertFalse(self.queue.heartbeat('s:1', 'w1'))
+        self.assertTrue(self.queue.heartbeat('s:1', 'w2'))
+    
+    def test_heartbeat_extends_lease(self):
+        self.queue = self.make_queue(lease_seconds=0.2)
+        self.queue.enqueue('s:1', 's', {'id': 1})
+        self.queue.claim('w1')
+        for _ in range(3):
+            time.sleep(0.1)
+            self.assertTrue(self.queue.heartbeat('s:1', 'w1'))
+        self.assertEqual(self.queue.claim('w2'), [])
+    
+    def test_expired_lease_fails_after_max_attempts(self):
+        self.queue = self.make_queue(lease_seconds=0.05, max_attempts=2)
+        self.queue.enqueue('s:1', 's', {'id': 1})
+        for _ in range(2):
+            self.assertEqual(len(self.queue.claim('w1')), 1)
+            time.sleep(0.1)
+        self.assertEqual(self.queue.claim('w1'), [])
+        self.assertEqual(self.queue.get_jobs(['s:1'])['s:1']['status'], FAILED)
+    
+    def test_complete_is_idempotent(self):
+        self.queue = self.make_queue(lease_seconds=0.05)
+        self.queue.enqueue('s:1', 's', {'id': 1})
+        self.queue.claim('w1')
+        time.sleep(0.1)
+        self.queue.claim('w2')
+        # 租约过期后仍可提交，但第二次提交不会覆盖首次结果
+        self.assertTrue(self.queue.complete('s:1', 'w1', {'path': 'first'}))
+        self.assertFalse(self.queue.complete('s:1', 'w2', {'path': 'second'}))
+        job = self.queue.get_jobs(['s:1'])['s:1']
+        self.assertEqual(job['status'], DONE)
+        self.assertEqual(job['result'], {'path': 'first'})
+        self.assertEqual(self.queue.claim('w3'), [])
+    
+    def test_fail_retries_until_max_attempts(self):
+        self.queue = self.make_queue(max_attempts=2)
+        self.queue.enqueue('s:1', 's', {'id': 1})
+        self.queue.claim('w1')
+        self.queue.fail('s:1', 'w1', 'boom')
+        self.assertEqual(self.queue.get_jobs(['s:1'])['s:1']['status'], PENDING)
+        self.queue.claim('w1')
+        self.queue.fail('s:1', 'w1', 'boom again')
+        job = self.queue.get_jobs(['s:1'])['s:1']
+        self.assertEqual(job['status'], FAILED)
+        self.assertEqual(job['error'], 'boom again')
+        self.assertEqual(job['attempts'], 2)
+    
+    def test_fail_ignored_without_lease(self):
+        self.queue.enqueue('s:1', 's', {'id': 1})
+        self.queue.claim('w1')
+        self.queue.fail('s:1', 'w2', 'not mine')
+        self.assertEqual(self.queue.get_jobs(['s:1'])['s:1']['status'], LEASED)
+    
+    def test_enqueue_resets_failed_and_forced_done(self):
+        self.queue = self.make_queue(max_attempts=1)
+        self.queue.enqueue('s:1', 's', {'id': 1})
+        self.queue.claim('w1')
+        self.queue.fail('s:1', 'w1', 'boom')
+        self.assertTrue(self.queue.enqueue('s:1', 's', {'id': 1}))
+        self.assertEqual(self.queue.get_jobs(['s:1'])['s:1']['attempts'], 0)
+        
+        self.queue.claim('w1')
+        self.queue.complete('s:1', 'w1', {})
+        self.assertFalse(self.queue.enqueue('s:1', 's', {'id': 1}))
+        self.assertTrue(self.queue.enqueue('s:1', 's', {'id': 1}, force=True))
+        self.assertEqual(self.queue.get_jobs(['s:1'])['s:1']['status'], PENDING)
+    
+    def test_get_jobs_skips_unknown(self):
+        self.queue.enqueue('s:1', 's', {'id': 1})
+        self.assertEqual(list(self.queue.get_jobs(['s:1', 's:missing'])), ['s:1'])
+
+
+class MemoryWorkQueueTest(WorkQueueContract, unittest.TestCase):
+    def make_queue(self, lease_seconds=300, max_attempts=3):
+        return MemoryWorkQueue(lease_seconds=lease_seconds, max_attempts=max_attempts)
+
+
+class SQLiteWorkQueueTest(WorkQueueContract, unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._queues = []
+        super().setUp()
+    
+    def tearDown(self):
+        for queue in self._queues:
+            queue.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def make_queue(self, lease_seconds=300, max_attempts=3):
+        path = os.path.join(self.tmpdir, f"queue{len(self._queues)}.db")
+        queue = SQLiteWorkQueue(path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+        self._queues.append(queue)
+        return queue
+    
+    def test_concurrent_claims_do_not_overlap(self):
+        for i in range(50):
+            self.queue.enqueue(f's:{i}', 's', {'id': i})
+        claimed = []
+        lock = threading.Lock()
+        
+        def claim(worker_id):
+            # 每个线程使用独立连接
+            while True:
+                jobs = self.queue.claim(worker_id, 3)
+                if not jobs:
+                    return
+                with lock:
+                    claimed.extend(job['id'] for job in jobs)
+        
+        threads = [threading.Thread(target=claim, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(claimed), sorted(f's:{i}' for i in range(50)))
+
+
+class FakeCrawler:
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.old_paths = {}
+    
+    def fetch_article(self, article_id, article_type, old_path=None):
+        if article_id in self.fail_ids:
+            raise RuntimeError('fetch failed')
+        self.old_paths[article_id] = old_path
+        return {'id': article_id, 'type': article_type}, f"/tmp/{article_id}.md"
+
+
+class QueueWorkerTest(unittest.TestCase):
+    def test_worker_completes_and_fails_jobs(self):
+        queue = MemoryWorkQueue(max_attempts=1)
+        queue.enqueue('s:1', 's', {'id': 1, 'type': 'section', 'old_path': 'old_1.md'})
+        queue.enqueue('s:2', 's', {'id': 2, 'type': 'section'})
+        queue.enqueue('x:3', 'x', {'id': 3, 'type': 'section'})
+        crawler = FakeCrawler(fail_ids={2})
+        worker = QueueWorker({'s': crawler}, queue, worker_id='w', concurrency=2, poll_interval=0.01)
+        stop = threading.Event()
+        thread = threading.Thread(target=worker.run, args=(stop,))
+        thread.start()
+        deadline = time.time() + 5
+        while time.time() < deadline and queue.stats().get(PENDING, 0) + queue.stats().get(LEASED, 0):
+            time.sleep(0.01)
+        stop.set()
+        thread.join()
+        
+        jobs = queue.get_jobs(['s:1', 's:2', 'x:3'])
+        self.assertEqual(jobs['s:1']['status'], DONE)
+        self.assertEqual(jobs['s:1']['result'], {'meta': {'id': 1, 'type': 'section'}, 'path': '/tmp/1.md'})
+        # 协调者传入的旧路径交给抓取器
+        self.assertEqual(crawler.old_paths[1], 'old_1.md')
+        self.assertEqual(jobs['s:2']['status'], FAILED)
+        # 未知的源同样标记为失败
+        self.assertEqual(jobs['x:3']['status'], FAILED)
+
+
+if __name__ == '__main__':
+    unittest.main()
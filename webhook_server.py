@@ -0,0 +1,162 @@
+import hmac
+import ipaddress
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+# 请求体大小上限
+MAX_BODY_SIZE = 64 * 1024
+
+# 允许的文章类型（会拼接到API地址中）
+ARTICLE_TYPES = ('section', 'article')
+
+
+def is_loopback(host: str) -> bool:
+    """监听地址是否只限本机访问"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class WebhookServer:
+    """本地Webhook监听服务：收到触发请求后立即通知对应爬虫检查或下载指定文章
+    
+    路由:
+        /trigger            单源模式（或多源模式下的第一个源）
+        /trigger/<source>   指定源
+    
+    只接受POST请求。未配置token时拒绝带 Origin 请求头的请求，防止本机浏览器中的网页跨站触发。
+    
+    参数（查询字符串、JSON或表单请求体）:
+        article_id  可选，指定文章ID时只下载（重新下载）该文章，否则执行一次完整检查
+        type        可选，文章类型（section / article）
+        token       配置了token时必须提供，也可以通过 X-Webhook-Token 请求头传递
+    """
+    
+    def __init__(self, crawlers: Dict, host: str = '127.0.0.1', port: int = 8765, token: str = ''):
+        """
+        初始化Webhook服务
+        
+        Args:
+            crawlers (Dict): 源名称到BlogCrawler的映射
+            host (str): 监听地址
+            port (int): 监听端口
+            token (str): 认证token，为空时不校验
+        """
+        self.crawlers = crawlers
+        self.default_source = next(iter(crawlers)) if crawlers else None
+        self.token = token
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def address(self) -> str:
+        """实际监听地址"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='webhook', daemon=True)
+        self._thread.start()
+        print(f"Webhook服务已启动: {self.address}/trigger")
+        if not self.token and not is_loopback(self.httpd.server_address[0]):
+            print("警告: Webhook监听在非本机地址且未配置token，任何能访问该端口的人都可以触发抓取，请设置 webhook.token")
+    
+    def stop(self):
+        """停止服务"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def _make_handler(self):
+        """创建请求处理类，绑定当前服务实例"""
+        server = self
+        
+        class TriggerHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._reply(405, {'error': 'method not allowed, use POST'}, {'Allow': 'POST'})
+            
+            def do_POST(self):
+                self._handle()
+            
+            def _handle(self):
+                parsed = urllib.parse.urlparse(self.path)
+                parts = [part for part in parsed.path.split('/') if part]
+                if not parts or parts[0] != 'trigger' or len(parts) > 2:
+                    return self._reply(404, {'error': 'not found'})
+                
+                params = {k: v[-1] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+                try:
+                    params.update(self._read_body())
+                except ValueError as e:
+                    return self._reply(400, {'error': str(e)})
+                
+                if server.token:
+                    token = self.headers.get('X-Webhook-Token') or str(params.get('token', ''))
+                    if not hmac.compare_digest(token.encode('utf-8'), server.token.encode('utf-8')):
+                        return self._reply(401, {'error': 'invalid token'})
+                elif self.headers.get('Origin'):
+                    # 浏览器发起的跨站请求会带Origin，Webhook和curl不会
+                    return self._reply(403, {'error': 'cross-origin requests require a token'})
+                
+                source = urllib.parse.unquote(parts[1]) if len(parts) == 2 else server.default_source
+                crawler = server.crawlers.get(source)
+                if crawler is None:
+                    return self._reply(404, {'error': f'unknown source: {source}'})
+                
+                article_id = params.get('article_id', params.get('id'))
+                if article_id in ('', None):
+                    article_id = None
+                else:
+                    try:
+                        article_id = int(article_id)
+                    except (TypeError, ValueError):
+                        return self._reply(400, {'error': 'invalid article_id'})
+                
+                article_type = params.get('type') or None
+                if article_type is not None and article_type not in ARTICLE_TYPES:
+                    return self._reply(400, {'error': f"invalid type, expected one of: {', '.join(ARTICLE_TYPES)}"})
+                crawler.trigger(article_id, article_type)
+                print(f"[{source}] 收到触发请求: {'文章 ' + str(article_id) if article_id else '完整检查'}")
+                self._reply(202, {'status': 'accepted', 'source': source, 'article_id': article_id})
+            
+            def _read_body(self) -> Dict:
+                """读取JSON请求体（可选）"""
+                length = int(self.headers.get('Content-Length') or 0)
+                if length <= 0:
+                    return {}
+                if length > MAX_BODY_SIZE:
+                    raise ValueError('body too large')
+                body = self.rfile.read(length)
+                content_type = self.headers.get('Content-Type', '')
+                if 'json' in content_type:
+                    try:
+                        data = json.loads(body.decode('utf-8'))
+                    except (UnicodeDecodeError, json.JSONDecodeError):
+                        raise ValueError('invalid json')
+                    return data if isinstance(data, dict) else {}
+                if 'x-www-form-urlencoded' in content_type:
+                    return {k: v[-1] for k, v in urllib.parse.parse_qs(body.decode('utf-8')).items()}
+                return {}
+            
+            def _reply(self, status: int, data: Dict, headers: Optional[Dict] = None):
+                payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, format, *args):
+                # 触发日志已在 _handle 中输出
+                pass
+        
+        return TriggerHandler
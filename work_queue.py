@@ -0,0 +1,503 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# 任务状态
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue(ABC):
+    """带租约的任务队列基类
+    
+    协调者将文章任务入队，工作者以限时租约领取任务并定期续租，
+    租约过期的任务（工作者崩溃）会被其他工作者自动重新领取。
+    """
+    
+    def __init__(self, lease_seconds: int = 300, max_attempts: int = 3):
+        """
+        初始化任务队列
+        
+        Args:
+            lease_seconds (int): 租约时长（秒）
+            max_attempts (int): 单个任务最大尝试次数
+        """
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+    
+    @abstractmethod
+    def enqueue(self, job_id: str, source: str, payload: Dict, force: bool = False) -> bool:
+        """
+        入队任务，已存在的任务不会重复入队
+        
+        Args:
+            job_id (str): 任务ID
+            source (str): 任务所属的源
+            payload (Dict): 任务参数
+            force (bool): 已完成的任务是否重新入队
+        
+        Returns:
+            bool: 是否新入队（或被重置为待处理）
+        """
+    
+    @abstractmethod
+    def claim(self, worker_id: str, limit: int = 1) -> List[Dict]:
+        """
+        领取任务（包括租约已过期的任务）
+        
+        Args:
+            worker_id (str): 工作者ID
+            limit (int): 最多领取的任务数
+        
+        Returns:
+            List[Dict]: 任务列表，包含 id、source、payload、attempts
+        """
+    
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """
+        续租
+        
+        Returns:
+            bool: 是否仍持有租约
+        """
+    
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Dict) -> bool:
+        """
+        提交任务结果，重复提交不会覆盖首次结果
+        
+        Returns:
+            bool: 本次提交是否生效
+        """
+    
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str):
+        """任务失败：未超过最大尝试次数时重新置为待处理，否则标记为失败"""
+    
+    @abstractmethod
+    def get_jobs(self, job_ids: List[str]) -> Dict[str, Dict]:
+        """
+        查询任务状态和结果
+        
+        Returns:
+            Dict[str, Dict]: 任务ID到 {status, result, error, attempts} 的映射
+        """
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """各状态的任务数量"""
+    
+    def close(self):
+        """释放资源"""
+        pass
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """基于SQLite的持久化任务队列，可放在多个进程/节点共享的存储卷上"""
+    
+    def __init__(self, path: str, lease_seconds: int = 300, max_attempts: int = 3, busy_timeout: int = 30):
+        """
+        初始化SQLite队列
+        
+        Args:
+            path (str): 数据库文件路径
+            lease_seconds (int): 租约时长（秒）
+            max_attempts (int): 单个任务最大尝试次数
+            busy_timeout (int): 等待数据库锁的超时时间（秒）
+        """
+        super().__init__(lease_seconds, max_attempts)
+        self.path = os.path.abspath(path)
+        self.busy_timeout = busy_timeout
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        self._init_db()
+    
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程使用独立连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # 自动提交模式，事务由 BEGIN IMMEDIATE 显式控制
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+    
+    def _init_db(self):
+        """创建表结构（共享网络卷上不使用WAL模式）"""
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, lease_expires)")
+    
+    def enqueue(self, job_id: str, source: str, payload: Dict, force: bool = False) -> bool:
+        """入队任务"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO jobs (id, source, payload, status, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, source, json.dumps(payload, ensure_ascii=False), PENDING, now, now)
+                )
+                queued = True
+            elif row['status'] == FAILED or (force and row['status'] == DONE):
+                conn.execute(
+                    """UPDATE jobs SET payload = ?, status = ?, attempts = 0, lease_owner = NULL,
+                       lease_expires = NULL, result = NULL, error = NULL, updated = ? WHERE id = ?""",
+                    (json.dumps(payload, ensure_ascii=False), PENDING, now, job_id)
+                )
+                queued = True
+            else:
+                queued = False
+            conn.execute("COMMIT")
+            return queued
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def claim(self, worker_id: str, limit: int = 1) -> List[Dict]:
+        """领取任务"""
+        now = time.time()
+        conn = self._conn()
+        jobs = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                """SELECT id, source, payload, status, attempts FROM jobs
+                   WHERE status = ? OR (status = ? AND lease_expires < ?)
+                   ORDER BY created LIMIT ?""",
+                (PENDING, LEASED, now, limit)
+            ).fetchall()
+            for row in rows:
+                # 租约过期且已达最大尝试次数的任务不再重试
+                if row['attempts'] >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, lease_owner = NULL, error = ?, updated = ? WHERE id = ?",
+                        (FAILED, '租约过期次数超过上限', now, row['id'])
+                    )
+                    continue
+                conn.execute(
+                    """UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?,
+                       attempts = attempts + 1, updated = ? WHERE id = ?""",
+                    (LEASED, worker_id, now + self.lease_seconds, now, row['id'])
+                )
+                jobs.append({
+                    'id': row['id'],
+                    'source': row['source'],
+                    'payload': json.loads(row['payload']),
+                    'attempts': row['attempts'] + 1
+                })
+            conn.execute("COMMIT")
+            return jobs
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """续租"""
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (now + self.lease_seconds, now, job_id, LEASED, worker_id)
+        )
+        return cursor.rowcount == 1
+    
+    def complete(self, job_id: str, worker_id: str, result: Dict) -> bool:
+        """提交结果，租约过期后仍允许提交，已完成的任务不会被覆盖"""
+        now = time.time()
+        cursor = self._conn().execute(
+            """UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL,
+               lease_expires = NULL, updated = ? WHERE id = ? AND status != ?""",
+            (DONE, json.dumps(result, ensure_ascii=False), now, job_id, DONE)
+        )
+        return cursor.rowcount == 1
+    
+    def fail(self, job_id: str, worker_id: str, error: str):
+        """任务失败"""
+        now = time.time()
+        self._conn().execute(
+            """UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+               lease_owner = NULL, lease_expires = NULL, error = ?, updated = ?
+               WHERE id = ? AND status = ? AND lease_owner = ?""",
+            (self.max_attempts, FAILED, PENDING, error, now, job_id, LEASED, worker_id)
+        )
+    
+    def get_jobs(self, job_ids: List[str]) -> Dict[str, Dict]:
+        """查询任务"""
+        jobs = {}
+        conn = self._conn()
+        # 分批查询，避免超过SQLite参数数量限制
+        for start in range(0, len(job_ids), 500):
+            batch = job_ids[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            rows = conn.execute(
+                f"SELECT id, status, result, error, attempts FROM jobs WHERE id IN ({placeholders})",
+                batch
+            ).fetchall()
+            for row in rows:
+                jobs[row['id']] = {
+                    'status': row['status'],
+                    'result': json.loads(row['result']) if row['result'] else None,
+                    'error': row['error'],
+                    'attempts': row['attempts']
+                }
+        return jobs
+    
+    def stats(self) -> Dict[str, int]:
+        """各状态的任务数量"""
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+    
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class MemoryWorkQueue(WorkQueue):
+    """进程内任务队列，接口与SQLite队列一致，用于单机运行或替代外部队列"""
+    
+    def __init__(self, lease_seconds: int = 300, max_attempts: int = 3):
+        super().__init__(lease_seconds, max_attempts)
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+    
+    def enqueue(self, job_id: str, source: str, payload: Dict, force: bool = False) -> bool:
+        """入队任务"""
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not (job['status'] == FAILED or (force and job['status'] == DONE)):
+                return False
+            self._jobs[job_id] = {
+                'id': job_id, 'source': source, 'payload': payload, 'status': PENDING,
+                'attempts': 0, 'lease_owner': None, 'lease_expires': None,
+                'result': None, 'error': None, 'created': now
+            }
+            return True
+    
+    def claim(self, worker_id: str, limit: int = 1) -> List[Dict]:
+        """领取任务"""
+        now = time.time()
+        jobs = []
+        with self._lock:
+            for job in sorted(self._jobs.values(), key=lambda j: j['created']):
+                if len(jobs) >= limit:
+                    break
+                if not (job['status'] == PENDING or (job['status'] == LEASED and job['lease_expires'] < now)):
+                    continue
+                if job['attempts'] >= self.max_attempts:
+                    job.update(status=FAILED, lease_owner=None, error='租约过期次数超过上限')
+                    continue
+                job.update(status=LEASED, lease_owner=worker_id,
+                           lease_expires=now + self.lease_seconds, attempts=job['attempts'] + 1)
+                jobs.append({
+                    'id': job['id'],
+                    'source': job['source'],
+                    'payload': job['payload'],
+                    'attempts': job['attempts']
+                })
+        return jobs
+    
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """续租"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job['status'] == LEASED and job['lease_owner'] == worker_id:
+                job['lease_expires'] = time.time() + self.lease_seconds
+                return True
+            return False
+    
+    def complete(self, job_id: str, worker_id: str, result: Dict) -> bool:
+        """提交结果"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] == DONE:
+                return False
+            job.update(status=DONE, result=result, error=None, lease_owner=None, lease_expires=None)
+            return True
+    
+    def fail(self, job_id: str, worker_id: str, error: str):
+        """任务失败"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job['status'] == LEASED and job['lease_owner'] == worker_id:
+                job.update(
+                    status=FAILED if job['attempts'] >= self.max_attempts else PENDING,
+                    lease_owner=None, lease_expires=None, error=error
+                )
+    
+    def get_jobs(self, job_ids: List[str]) -> Dict[str, Dict]:
+        """查询任务"""
+        with self._lock:
+            return {
+                job_id: {
+                    'status': job['status'],
+                    'result': job['result'],
+                    'error': job['error'],
+                    'attempts': job['attempts']
+                }
+                for job_id, job in ((job_id, self._jobs.get(job_id)) for job_id in job_ids)
+                if job is not None
+            }
+    
+    def stats(self) -> Dict[str, int]:
+        """各状态的任务数量"""
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return counts
+
+
+def default_worker_id() -> str:
+    """默认工作者ID：主机名-进程号"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def create_work_queue(config: Dict) -> WorkQueue:
+    """
+    根据配置创建任务队列
+    
+    Args:
+        config (Dict): 完整配置字典
+    
+    Returns:
+        WorkQueue: 任务队列实例
+    """
+    queue_config = config['queue']
+    backend = queue_config.get('backend', 'sqlite')
+    lease_seconds = queue_config.get('lease_seconds', 300)
+    max_attempts = queue_config.get('max_attempts', 3)
+    
+    if backend == 'sqlite':
+        path = queue_config.get('path') or os.path.join(config['storage']['path'], 'queue.db')
+        return SQLiteWorkQueue(path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    if backend == 'memory':
+        return MemoryWorkQueue(lease_seconds=lease_seconds, max_attempts=max_attempts)
+    raise ValueError(f"不支持的任务队列后端: {backend}")
+
+
+class QueueWorker:
+    """队列工作者：领取文章任务、持续续租并提交结果"""
+    
+    def __init__(self, crawlers: Dict, queue: WorkQueue, worker_id: Optional[str] = None,
+                 concurrency: int = 5, poll_interval: float = 2, heartbeat_interval: float = 60):
+        """
+        初始化工作者
+        
+        Args:
+            crawlers (Dict): 源名称到BlogCrawler的映射
+            queue (WorkQueue): 任务队列
+            worker_id (Optional[str]): 工作者ID，为空时使用 主机名-进程号
+            concurrency (int): 同时处理的任务数
+            poll_interval (float): 队列为空时的轮询间隔（秒）
+            heartbeat_interval (float): 续租间隔（秒），应明显小于租约时长
+        """
+        self.crawlers = crawlers
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._active: Dict[str, Dict] = {}
+        self._active_lock = threading.Lock()
+        self._slot_free = threading.Event()
+    
+    def run(self, stop_event: Optional[threading.Event] = None):
+        """
+        持续领取并处理任务，直到收到停止信号
+        
+        Args:
+            stop_event (Optional[threading.Event]): 停止信号
+        """
+        stop_event = stop_event or threading.Event()
+        # 续租持续到所有处理中的任务结束
+        heartbeat_stop = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, args=(heartbeat_stop,), name='queue-heartbeat', daemon=True
+        )
+        heartbeat_thread.start()
+        print(f"工作者 {self.worker_id} 已启动，并发数 {self.concurrency}")
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='queue-worker') as pool:
+            while not stop_event.is_set():
+                with self._active_lock:
+                    free = self.concurrency - len(self._active)
+                    self._slot_free.clear()
+                if free <= 0:
+                    self._slot_free.wait(self.poll_interval)
+                    continue
+                try:
+                    jobs = self.queue.claim(self.worker_id, free)
+                except Exception as e:
+                    print(f"领取任务失败: {str(e)}")
+                    jobs = []
+                if not jobs:
+                    stop_event.wait(self.poll_interval)
+                    continue
+                for job in jobs:
+                    with self._active_lock:
+                        self._active[job['id']] = job
+                    pool.submit(self._process, job)
+        heartbeat_stop.set()
+        print(f"工作者 {self.worker_id} 已停止")
+    
+    def _process(self, job: Dict):
+        """处理单个任务"""
+        try:
+            crawler = self.crawlers.get(job['source'])
+            if crawler is None:
+                raise ValueError(f"未知的源: {job['source']}")
+            payload = job['payload']
+            meta, filepath = crawler.fetch_article(payload['id'], payload['type'], payload.get('old_path'))
+            if self.queue.complete(job['id'], self.worker_id, {'meta': meta, 'path': filepath}):
+                print(f"[{job['source']}] 任务完成: {job['id']}")
+        except Exception as e:
+            print(f"[{job['source']}] 任务失败 {job['id']} (第{job['attempts']}次): {str(e)}")
+            try:
+                self.queue.fail(job['id'], self.worker_id, str(e))
+            except Exception as fail_error:
+                print(f"标记任务失败时出错: {str(fail_error)}")
+        finally:
+            with self._active_lock:
+                self._active.pop(job['id'], None)
+                self._slot_free.set()
+    
+    def _heartbeat_loop(self, stop_event: threading.Event):
+        """定期为处理中的任务续租"""
+        while not stop_event.wait(self.heartbeat_interval):
+            with self._active_lock:
+                job_ids = list(self._active.keys())
+            for job_id in job_ids:
+                try:
+                    if not self.queue.heartbeat(job_id, self.worker_id):
+                        print(f"任务租约已失效: {job_id}")
+                except Exception as e:
+                    print(f"续租失败 {job_id}: {str(e)}")